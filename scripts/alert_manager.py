@@ -4,42 +4,231 @@ NodeGuardian Alert Manager Python Script
 处理告警模板渲染和发送
 """
 
+import atexit
+import functools
+import hashlib
+import html
 import json
 import os
+import re
 import sys
+import time
 import logging
-import subprocess
 import smtplib
+import string
+import threading
 import requests
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Dict, List, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
-# 导入配置加载器
-from config_loader import get_config, get_config_section, get_config_value
+# 导入配置加载器和日志初始化
+from config_loader import config_loader, get_config, get_config_section
+from json_util import dumps, dumps_indented, loads, write_file_atomic
+from log_setup import setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(get_config_section('log'))
 logger = logging.getLogger(__name__)
 
+# 内存中模板的有效期（秒），过期后重新从watch维护的模板文件加载
+TEMPLATE_CACHE_TTL = 60
+
+# 并发发送告警渠道的最大线程数
+CHANNEL_SEND_WORKERS = 8
+
+# 复用SMTP连接的最长时间（秒），超过后重新建立连接，避免使用被服务器空闲断开的连接
+SMTP_CONNECTION_TTL = 60
+
+# 相同告警的去重窗口（秒），规则抖动时窗口内的重复告警直接丢弃
+ALERT_DEDUP_WINDOW = 30
+
+# 模板占位符，如 {{.ruleName}}
+_PLACEHOLDER_RE = re.compile(r'\{\{\.(\w+)\}\}')
+
+
+class _TemplateValues(dict):
+    """模板占位符取值，模板中未知的占位符保持原样输出"""
+    
+    def __missing__(self, key: str) -> str:
+        return '{{.%s}}' % key
+
+
+def _compile_template(text: str) -> Callable[[Dict[str, str]], str]:
+    """将模板文本预编译为str.format_map格式串，渲染时只需一次format_map调用，未知占位符保持原样"""
+    parts = _PLACEHOLDER_RE.split(text)
+    if len(parts) == 1:
+        return lambda values: text
+    
+    # split结果中奇数位置为占位符名称，其余为需要转义花括号的普通文本；不是合法标识符的占位符按普通文本处理
+    fmt = ''.join(
+        ('{%s}' % part if part.isidentifier() else '{{{{.%s}}}}' % part) if i % 2
+        else part.replace('{', '{{').replace('}', '}}')
+        for i, part in enumerate(parts)
+    )
+    return lambda values: fmt.format_map(values)
+
+
+def _channel_key(channel: Dict[str, Any]) -> Tuple:
+    """生成渠道去重键，标量字段直接使用，只有嵌套的headers、urls等字段才序列化"""
+    return tuple(sorted(
+        (key, json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value)
+        for key, value in channel.items()
+    ))
+
+
+# 默认告警模板，进程内只构建一次
+_DEFAULT_TEMPLATE_SPEC = {
+    "title": "NodeGuardian Alert",
+    "summary": "NodeGuardian rule triggered",
+    "description": "Rule {{.ruleName}} has been triggered on nodes: {{.triggeredNodes}}",
+    "severity": "warning",
+    "channels": [
+        {
+            "type": "log",
+            "enabled": True
+        }
+    ]
+}
+
+# 模板缺少字段时使用的默认值，分为触发告警和恢复告警两组
+_TRIGGER_DEFAULTS = {
+    "title": "NodeGuardian Alert",
+    "summary": "Rule triggered",
+    "description": "Rule {{.ruleName}} triggered",
+    "severity": "warning"
+}
+
+_RECOVERY_DEFAULTS = {
+    "title": "NodeGuardian Recovery Alert",
+    "summary": "Node recovered",
+    "description": "Node {{.triggeredNodes}} has recovered from rule {{.ruleName}}",
+    "severity": "info"
+}
+
+# 默认模板字段在模块加载时预编译
+_DEFAULT_RENDERERS = {
+    spec[field]: _compile_template(spec[field])
+    for spec in (_DEFAULT_TEMPLATE_SPEC, _TRIGGER_DEFAULTS, _RECOVERY_DEFAULTS)
+    for field in ("title", "summary", "description")
+}
+
+# 告警级别对应的邮件标题背景色
+_SEVERITY_COLORS = {
+    'critical': '#dc3545',
+    'warning': '#ffc107',
+    'info': '#17a2b8',
+    'success': '#28a745'
+}
+
+# 邮件HTML的固定结构在模块加载时构建，每封邮件只替换可变字段
+_EMAIL_HTML_TEMPLATE = string.Template("""\
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>NodeGuardian Alert</title>
+</head>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <div style="background-color: $color; color: white; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+            <h1 style="margin: 0; font-size: 24px;">$title</h1>
+        </div>
+
+        <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
+            <h2 style="margin-top: 0; color: #495057;">Summary</h2>
+            <p>$summary</p>
+        </div>
+
+        <div style="background-color: #ffffff; padding: 15px; border: 1px solid #dee2e6; border-radius: 5px; margin-bottom: 20px;">
+            <h3 style="margin-top: 0; color: #495057;">Details</h3>
+            <p><strong>Rule:</strong> $rule_name</p>
+            <p><strong>Description:</strong> $rule_description</p>
+            <p><strong>Triggered Nodes:</strong> $triggered_nodes</p>
+            <p><strong>Timestamp:</strong> $timestamp</p>
+        </div>
+
+        <div style="background-color: #e9ecef; padding: 15px; border-radius: 5px;">
+            <h3 style="margin-top: 0; color: #495057;">Full Description</h3>
+            <p>$description</p>
+        </div>
+
+        <div style="text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; color: #6c757d; font-size: 12px;">
+            <p>This alert was generated by NodeGuardian</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
 class AlertManager:
     """NodeGuardian告警管理器"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, session: Optional[requests.Session] = None):
         self.config_dir = "/etc/nodeguardian/config"
         self.secrets_dir = "/etc/nodeguardian/secrets"
         self.config_file = f"{self.config_dir}/config.json"
         self.templates_dir = "/tmp/nodeguardian/templates"
+        self.dedup_dir = "/tmp/nodeguardian/state/alerts"
         
         # 确保目录存在
         Path(self.templates_dir).mkdir(parents=True, exist_ok=True)
+        Path(self.dedup_dir).mkdir(parents=True, exist_ok=True)
+        
+        # 加载配置，调用方可传入已加载的配置
+        self.config = config if config is not None else get_config()
+        
+        # 内存中的模板注册表: 模板名 -> (加载时间, 模板文件修改时间, 模板对象)，默认模板没有文件，修改时间为None
+        self._template_registry: Dict[str, Tuple[float, Optional[int], Dict[str, Any]]] = {}
         
-        # 加载配置
-        self.config = get_config()
+        # 已编译模板缓存: (模板名, 字段) -> (模板源文本, 渲染函数)
+        self._compiled_templates: Dict[Tuple[str, str], Tuple[str, Callable[[Dict[str, str]], str]]] = {}
+        
+        # 解析后的邮件配置和复用的SMTP连接
+        self._email_settings: Optional[Dict[str, Any]] = None
+        
+        # 已读取的Secret: Secret名 -> (文件修改时间, 值)
+        self._secret_cache: Dict[str, Tuple[Optional[int], str]] = {}
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._smtp_expires_at = 0.0
+        self._smtp_lock = threading.Lock()
+        atexit.register(self._close_smtp)
+        
+        # 复用的HTTP连接池，Webhook请求保持keep-alive，首次发送Webhook时才创建
+        # 调用方传入的会话由调用方负责关闭，便于多个组件共享同一个连接池
+        self._session: Optional[requests.Session] = session
+        self._session_lock = threading.Lock()
+    
+    def _get_session(self) -> requests.Session:
+        """获取HTTP会话，只同步模板或只发送日志、邮件的进程不会创建连接池"""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_http_session()
+                atexit.register(self._session.close)
+            return self._session
+    
+    def _create_http_session(self) -> requests.Session:
+        """创建带连接池和重试的HTTP会话"""
+        retry_attempts = int(self.config.get('alert', {}).get('retryAttempts', 3))
+        # 告警POST不是幂等的，只重试未建立连接的请求；读超时或5xx时接收方可能已经处理过，重发会产生重复告警
+        retry = Retry(
+            total=retry_attempts,
+            connect=retry_attempts,
+            read=0,
+            status=0,
+            backoff_factor=0.3,
+            allowed_methods=frozenset(['POST'])
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+        
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
     
     def run(self, args: List[str]) -> None:
         """主运行函数"""
@@ -47,9 +236,9 @@ class AlertManager:
             if len(args) >= 4:
                 # 直接调用模式
                 template_name = args[0]
-                rule_object = json.loads(args[1])
-                triggered_nodes = json.loads(args[2])
-                channels = json.loads(args[3])
+                rule_object = loads(args[1])
+                triggered_nodes = loads(args[2])
+                channels = loads(args[3])
                 
                 logger.info(f"Processing direct alert call: template={template_name}, nodes={triggered_nodes}")
                 self.send_alert(template_name, rule_object, triggered_nodes, channels)
@@ -57,13 +246,14 @@ class AlertManager:
                 # 绑定上下文模式
                 binding_context_path = os.environ.get('BINDING_CONTEXT_PATH', '/tmp/binding_context.json')
                 
-                if not os.path.exists(binding_context_path):
+                # 直接读取整个文件，文件不存在时由open报错，无需先单独检查
+                try:
+                    with open(binding_context_path, 'rb') as f:
+                        binding_context = loads(f.read())
+                except FileNotFoundError:
                     logger.error(f"Binding context file not found: {binding_context_path}")
                     sys.exit(1)
                 
-                with open(binding_context_path, 'r') as f:
-                    binding_context = json.load(f)
-                
                 if not binding_context:
                     logger.error("Empty binding context")
                     sys.exit(1)
@@ -112,10 +302,18 @@ class AlertManager:
         template_name = template_object.get('metadata', {}).get('name')
         logger.info(f"Registering alert template: {template_name}")
         
-        # 保存模板到文件
+        # 保存模板到文件，内容未变化时不重写文件，也不清除已编译的渲染函数
         template_file = f"{self.templates_dir}/{template_name}.json"
-        with open(template_file, 'w') as f:
-            json.dump(template_object, f, indent=2)
+        # 与控制器写入同一个模板文件，同样先写临时文件再原子替换，并发启动的告警进程不会读到写了一半的模板
+        if write_file_atomic(template_file, dumps_indented(template_object)):
+            self._invalidate_compiled(template_name)
+        self._template_registry[template_name] = (time.monotonic(), os.stat(template_file).st_mtime_ns, template_object)
+        
+        # 注册时预编译模板字段，告警时只需查找渲染函数
+        spec = template_object.get('spec', {})
+        for field in ('title', 'summary', 'description'):
+            if isinstance(spec.get(field), str):
+                self._get_compiled(template_name, field, spec[field])
         
         logger.info(f"Alert template registered: {template_name}")
     
@@ -125,52 +323,123 @@ class AlertManager:
         
         # 删除模板文件
         template_file = f"{self.templates_dir}/{template_name}.json"
-        if os.path.exists(template_file):
+        try:
             os.remove(template_file)
+        except FileNotFoundError:
+            pass
+        self._template_registry.pop(template_name, None)
+        self._invalidate_compiled(template_name)
         
         logger.info(f"Alert template unregistered: {template_name}")
     
+    def _invalidate_compiled(self, template_name: str) -> None:
+        """清除模板对应的已编译渲染函数"""
+        for key in [k for k in self._compiled_templates if k[0] == template_name]:
+            del self._compiled_templates[key]
+    
+    def _get_compiled(self, template_name: str, field: str, source: str) -> Callable[[Dict[str, str]], str]:
+        """获取模板字段的渲染函数，模板源文本未变化时复用已编译结果"""
+        key = (template_name, field)
+        cached = self._compiled_templates.get(key)
+        if cached is not None and cached[0] == source:
+            return cached[1]
+        
+        renderer = _DEFAULT_RENDERERS.get(source) or _compile_template(source)
+        self._compiled_templates[key] = (source, renderer)
+        return renderer
+    
     def send_alert(self, template_name: str, rule_object: Dict[str, Any], triggered_nodes: List[str], channels: List[Dict[str, Any]]) -> None:
         """发送告警"""
         # 获取模板
-        template_file = f"{self.templates_dir}/{template_name}.json"
-        if not os.path.exists(template_file):
-            logger.warning(f"Alert template not found: {template_name}, using default")
-            self.create_default_template(template_name)
+        template_object = self.load_template(template_name)
         
-        with open(template_file, 'r') as f:
-            template_object = json.load(f)
+        # 先确定实际可发送的渠道，没有渠道时无需渲染
+        enabled_channels = self.resolve_channels(channels, template_object)
+        if not enabled_channels:
+            logger.info(f"No enabled alert channels for template: {template_name}, skipping alert")
+            return
+        
+        # 去重窗口内发送过的相同告警不再发送，渠道不同的告警动作互不影响
+        dedup_key = self.alert_dedup_key(template_name, rule_object, triggered_nodes, enabled_channels)
+        if self.is_duplicate_alert(dedup_key):
+            logger.info(f"Duplicate alert for template: {template_name} within {ALERT_DEDUP_WINDOW}s, skipping")
+            return
         
         # 渲染告警内容
         alert_content = self.render_alert_content(template_object, rule_object, triggered_nodes)
         
-        # 发送到各个渠道
-        self.send_to_channels(alert_content, channels, template_object)
+        # 发送到各个渠道，至少一个渠道发送成功后才记录，全部失败时后续重试不会被去重丢弃
+        if self.dispatch_to_channels(alert_content, enabled_channels):
+            self.record_alert_sent(dedup_key)
+    
+    def alert_dedup_key(self, template_name: str, rule_object: Dict[str, Any], triggered_nodes: List[str], enabled_channels: List[Dict[str, Any]]) -> str:
+        """生成告警去重键，由模板、规则、告警类型、节点和实际发送的渠道共同决定"""
+        rule_name = rule_object.get('metadata', {}).get('name', 'unknown')
+        alert_type = rule_object.get('type', 'trigger')
+        channel_keys = sorted(repr(_channel_key(channel)) for channel in enabled_channels)
+        identity = '\0'.join([template_name, rule_name, alert_type] + sorted(triggered_nodes) + ['\1'] + channel_keys)
+        return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+    
+    def is_duplicate_alert(self, dedup_key: str) -> bool:
+        """检查去重窗口内是否已发送过相同告警，每次告警都在独立进程中处理，发送记录保存在磁盘上"""
+        try:
+            last_sent = os.path.getmtime(f"{self.dedup_dir}/{dedup_key}")
+        except OSError:
+            return False
+        return time.time() - last_sent < ALERT_DEDUP_WINDOW
+    
+    def record_alert_sent(self, dedup_key: str) -> None:
+        """记录告警已发送，同时删除超出去重窗口的发送记录，避免记录文件无限累积"""
+        now = time.time()
+        try:
+            with os.scandir(self.dedup_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.name != dedup_key and now - entry.stat().st_mtime >= ALERT_DEDUP_WINDOW:
+                            os.remove(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Failed to prune alert dedup markers: {e}")
+        
+        try:
+            Path(f"{self.dedup_dir}/{dedup_key}").touch()
+        except OSError as e:
+            logger.warning(f"Failed to record alert dedup marker: {e}")
     
-    def create_default_template(self, template_name: str) -> None:
-        """创建默认模板"""
+    def load_template(self, template_name: str) -> Dict[str, Any]:
+        """加载告警模板，有效期内的模板直接从内存注册表返回，过期后模板文件未修改时也不重新解析"""
+        cached = self._template_registry.get(template_name)
+        if cached is not None and time.monotonic() - cached[0] < TEMPLATE_CACHE_TTL:
+            return cached[2]
+        
         template_file = f"{self.templates_dir}/{template_name}.json"
+        try:
+            mtime_ns = os.stat(template_file).st_mtime_ns
+            if cached is not None and cached[1] == mtime_ns:
+                template_object = cached[2]
+            else:
+                with open(template_file, 'rb') as f:
+                    template_object = loads(f.read())
+        except FileNotFoundError:
+            logger.warning(f"Alert template not found: {template_name}, using default")
+            template_object = self.build_default_template(template_name)
+            mtime_ns = None
         
-        default_template = {
+        self._template_registry[template_name] = (time.monotonic(), mtime_ns, template_object)
+        return template_object
+    
+    def build_default_template(self, template_name: str) -> Dict[str, Any]:
+        """构建默认模板，只保存在内存注册表中，不写入模板目录"""
+        # 复制模块级默认配置，调用方修改模板不会影响进程内后续使用的默认模板
+        spec = dict(_DEFAULT_TEMPLATE_SPEC)
+        spec["channels"] = [dict(channel) for channel in _DEFAULT_TEMPLATE_SPEC["channels"]]
+        return {
             "metadata": {
                 "name": template_name
             },
-            "spec": {
-                "title": "NodeGuardian Alert",
-                "summary": "NodeGuardian rule triggered",
-                "description": "Rule {{.ruleName}} has been triggered on nodes: {{.triggeredNodes}}",
-                "severity": "warning",
-                "channels": [
-                    {
-                        "type": "log",
-                        "enabled": True
-                    }
-                ]
-            }
+            "spec": spec
         }
-        
-        with open(template_file, 'w') as f:
-            json.dump(default_template, f, indent=2)
     
     def render_alert_content(self, template_object: Dict[str, Any], rule_object: Dict[str, Any], triggered_nodes: List[str]) -> Dict[str, Any]:
         """渲染告警内容"""
@@ -181,24 +450,23 @@ class AlertManager:
         rule_description = rule_object.get('spec', {}).get('metadata', {}).get('description', 'No description')
         rule_severity = rule_object.get('spec', {}).get('metadata', {}).get('severity', 'warning')
         
-        # 获取模板字段
+        # 获取模板字段，恢复告警使用恢复相关的默认值
         spec = template_object.get('spec', {})
-        title = spec.get('title', 'NodeGuardian Alert')
-        summary = spec.get('summary', 'Rule triggered')
-        description = spec.get('description', 'Rule {{.ruleName}} triggered')
-        severity = spec.get('severity', 'warning')
-        
-        # 如果是恢复告警，使用恢复相关的默认值
-        if alert_type == "recovery":
-            title = spec.get('title', 'NodeGuardian Recovery Alert')
-            summary = spec.get('summary', 'Node recovered')
-            description = spec.get('description', 'Node {{.triggeredNodes}} has recovered from rule {{.ruleName}}')
-            severity = spec.get('severity', 'info')
-        
-        # 简单的模板替换
-        rendered_title = title.replace('{{.ruleName}}', rule_name)
-        rendered_summary = summary.replace('{{.ruleName}}', rule_name)
-        rendered_description = description.replace('{{.ruleName}}', rule_name).replace('{{.triggeredNodes}}', ', '.join(triggered_nodes))
+        defaults = _RECOVERY_DEFAULTS if alert_type == "recovery" else _TRIGGER_DEFAULTS
+        title = spec.get('title', defaults['title'])
+        summary = spec.get('summary', defaults['summary'])
+        description = spec.get('description', defaults['description'])
+        severity = spec.get('severity', defaults['severity'])
+        
+        # 使用预编译模板渲染
+        template_name = template_object.get('metadata', {}).get('name', '')
+        values = _TemplateValues(
+            ruleName=rule_name,
+            triggeredNodes=', '.join(triggered_nodes)
+        )
+        rendered_title = self._get_compiled(template_name, 'title', title)(values)
+        rendered_summary = self._get_compiled(template_name, 'summary', summary)(values)
+        rendered_description = self._get_compiled(template_name, 'description', description)(values)
         
         # 构建告警内容
         alert_content = {
@@ -216,39 +484,77 @@ class AlertManager:
     
     def send_to_channels(self, alert_content: Dict[str, Any], channels: List[Dict[str, Any]], template_object: Dict[str, Any]) -> None:
         """发送到各个渠道"""
+        self.dispatch_to_channels(alert_content, self.resolve_channels(channels, template_object))
+    
+    def resolve_channels(self, channels: List[Dict[str, Any]], template_object: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """合并请求渠道和模板默认渠道，返回去重后已启用且已配置的渠道"""
         # 获取模板中的默认渠道
         template_channels = template_object.get('spec', {}).get('channels', [])
         
-        # 合并渠道
-        all_channels = channels + template_channels
-        # 去重
-        unique_channels = []
-        seen = set()
-        for channel in all_channels:
-            channel_key = json.dumps(channel, sort_keys=True)
-            if channel_key not in seen:
-                unique_channels.append(channel)
-                seen.add(channel_key)
-        
-        for channel in unique_channels:
+        # 合并渠道并去重，规则中的渠道可以直接写渠道类型，如 "email"；相同渠道保留首次出现的位置
+        unique_channels: Dict[Tuple, Dict[str, Any]] = {}
+        for channel in channels + template_channels:
+            if isinstance(channel, str):
+                channel = {"type": channel}
+            unique_channels.setdefault(_channel_key(channel), channel)
+        
+        return [
+            channel for channel in unique_channels.values()
+            if channel.get('enabled', True) and self._channel_configured(channel)
+        ]
+    
+    def _channel_configured(self, channel: Dict[str, Any]) -> bool:
+        """检查渠道是否具备发送条件"""
+        channel_type = channel.get('type')
+        if channel_type in ("log", "email"):
+            return True
+        if channel_type == "webhook":
+            if self.get_webhook_urls(channel):
+                return True
+            logger.warning("Webhook URL not configured")
+            return False
+        
+        logger.warning(f"Unknown channel type: {channel_type}")
+        return False
+    
+    def dispatch_to_channels(self, alert_content: Dict[str, Any], enabled_channels: List[Dict[str, Any]]) -> bool:
+        """将告警内容发送到已解析的渠道，Webhook的每个URL作为独立任务与其他渠道共用同一个线程池，返回是否至少一个发送成功"""
+        tasks: List[Callable[[], bool]] = []
+        body: Optional[bytes] = None
+        for channel in enabled_channels:
             channel_type = channel.get('type')
-            channel_enabled = channel.get('enabled', True)
-            
-            if channel_enabled:
-                self.send_to_channel(channel_type, channel, alert_content)
+            if channel_type == "webhook":
+                # 告警内容只序列化一次，所有Webhook渠道共用
+                if body is None:
+                    body = dumps(alert_content)
+                tasks.extend(self.webhook_tasks(channel, alert_content, body))
+            else:
+                tasks.append(functools.partial(self.send_to_channel, channel_type, channel, alert_content))
+        
+        return any(self._run_concurrently(tasks))
     
-    def send_to_channel(self, channel_type: str, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> None:
-        """发送到单个渠道"""
+    def _run_concurrently(self, tasks: List[Callable[[], bool]]) -> List[bool]:
+        """并发执行相互独立的发送任务并返回各任务是否成功，并发数不超过连接池大小，避免连接被丢弃"""
+        if len(tasks) <= 1:
+            return [task() for task in tasks]
+        
+        workers = min(len(tasks), CHANNEL_SEND_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda task: task(), tasks))
+    
+    def send_to_channel(self, channel_type: str, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> bool:
+        """发送到单个渠道，返回是否发送成功"""
         if channel_type == "log":
-            self.send_to_log(alert_content)
+            return self.send_to_log(alert_content)
         elif channel_type == "webhook":
-            self.send_to_webhook(channel_config, alert_content)
+            return self.send_to_webhook(channel_config, alert_content)
         elif channel_type == "email":
-            self.send_to_email(channel_config, alert_content)
+            return self.send_to_email(channel_config, alert_content)
         else:
             logger.warning(f"Unknown channel type: {channel_type}")
+            return False
     
-    def send_to_log(self, alert_content: Dict[str, Any]) -> None:
+    def send_to_log(self, alert_content: Dict[str, Any]) -> bool:
         """发送到日志"""
         title = alert_content.get('title')
         summary = alert_content.get('summary')
@@ -258,152 +564,193 @@ class AlertManager:
         
         logger.info(f"ALERT [{severity}] {title} - {summary}")
         logger.info(f"Rule: {rule_name}, Nodes: {triggered_nodes}")
+        return True
     
-    def send_to_webhook(self, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> None:
-        """发送到Webhook"""
-        webhook_url = None
-        webhook_headers = {}
-        
-        if channel_config and channel_config != {}:
+    def get_webhook_urls(self, channel_config: Dict[str, Any]) -> List[str]:
+        """获取Webhook渠道的目标URL列表"""
+        if channel_config and (channel_config.get('url') or channel_config.get('urls')):
             # 使用传入的配置
-            webhook_url = channel_config.get('url')
-            webhook_headers = channel_config.get('headers', {})
+            urls = [channel_config['url']] if channel_config.get('url') else []
+            urls.extend(channel_config.get('urls', []))
         else:
             # 使用ConfigMap中的配置
-            webhook_url = self.config.get('alert', {}).get('webhookUrl')
+            alert_config = self.config.get('alert', {})
+            urls = [alert_config['webhookUrl']] if alert_config.get('webhookUrl') else []
+            urls.extend(alert_config.get('webhookUrls', []))
         
-        if not webhook_url:
+        # 去重并保持顺序
+        return [url for url in dict.fromkeys(urls) if url]
+    
+    def send_to_webhook(self, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> bool:
+        """发送到Webhook，返回是否至少一个URL发送成功"""
+        return any(self._run_concurrently(self.webhook_tasks(channel_config, alert_content)))
+    
+    def webhook_tasks(self, channel_config: Dict[str, Any], alert_content: Dict[str, Any], body: Optional[bytes] = None) -> List[Callable[[], bool]]:
+        """为渠道配置的每个Webhook URL生成一个发送任务，可传入已序列化的告警内容"""
+        webhook_urls = self.get_webhook_urls(channel_config)
+        if not webhook_urls:
             logger.warning("Webhook URL not configured")
-            return
+            return []
+        
+        # 设置默认headers
+        headers = {
+            'Content-Type': 'application/json'
+        }
+        if channel_config:
+            headers.update(channel_config.get('headers', {}))
+        
+        # 告警内容只序列化一次，发送到所有URL
+        if body is None:
+            body = dumps(alert_content)
         
+        return [functools.partial(self.post_webhook, webhook_url, body, headers) for webhook_url in webhook_urls]
+    
+    def post_webhook(self, webhook_url: str, body: bytes, headers: Dict[str, str]) -> bool:
+        """向单个Webhook URL发送已序列化的告警内容，返回是否发送成功"""
         logger.info(f"Sending alert to webhook: {webhook_url}")
         
         try:
-            # 设置默认headers
-            headers = {
-                'Content-Type': 'application/json'
-            }
-            headers.update(webhook_headers)
-            
-            # 发送请求
-            response = requests.post(
+            response = self._get_session().post(
                 webhook_url,
-                json=alert_content,
+                data=body,
                 headers=headers,
                 timeout=30
             )
             response.raise_for_status()
             logger.info("Webhook alert sent successfully")
+            return True
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to send webhook alert: {e}")
+            return False
     
-    def send_to_email(self, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> None:
-        """发送到邮件"""
+    def send_to_email(self, channel_config: Dict[str, Any], alert_content: Dict[str, Any]) -> bool:
+        """发送到邮件，返回是否发送成功"""
         try:
             # 获取邮件配置
-            email_config = self.config.get('email', {})
+            settings = self._get_email_settings()
             
             # 加载敏感信息
-            from config_loader import config_loader
-            username = config_loader.load_secret('email-username')
-            password = config_loader.load_secret('email-password')
+            username = self._get_secret('email-username')
+            password = self._get_secret('email-password')
             
             if not username or not password:
                 logger.error("Email credentials not configured")
-                return
-            
-            smtp_server = email_config.get('smtpServer', 'smtp.gmail.com')
-            smtp_port = email_config.get('smtpPort', 587)
-            use_tls = email_config.get('useTLS', True)
-            use_ssl = email_config.get('useSSL', False)
-            from_addr = email_config.get('from', 'nodeguardian@example.com')
-            to_addrs = email_config.get('to', ['admin@example.com'])
+                return False
             
             # 创建邮件内容
-            msg = MIMEMultipart('alternative')
-            msg['From'] = from_addr
-            msg['To'] = ', '.join(to_addrs)
+            msg = EmailMessage()
+            msg['From'] = settings['from_addr']
+            msg['To'] = settings['to_header']
             msg['Subject'] = f"[{alert_content.get('severity', 'INFO').upper()}] {alert_content.get('title', 'NodeGuardian Alert')}"
             
             # 创建HTML内容
             html_content = self.create_email_html(alert_content)
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
+            msg.set_content(html_content, subtype='html')
             
             # 发送邮件
-            if use_ssl:
-                server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-            else:
-                server = smtplib.SMTP(smtp_server, smtp_port)
-                if use_tls:
-                    server.starttls()
-            
-            server.login(username, password)
-            server.send_message(msg)
-            server.quit()
+            with self._smtp_lock:
+                smtp_args = (settings['smtp_server'], settings['smtp_port'], settings['use_tls'], settings['use_ssl'], username, password)
+                try:
+                    self._get_smtp(*smtp_args).send_message(msg)
+                except (smtplib.SMTPServerDisconnected, OSError) as e:
+                    # 复用的连接可能在NOOP检查之后被服务器断开，重新建立连接后重试一次
+                    logger.warning(f"SMTP connection lost, reconnecting: {e}")
+                    self._close_smtp()
+                    self._get_smtp(*smtp_args).send_message(msg)
             
             logger.info("Email sent successfully")
+            return True
             
         except Exception as e:
             logger.error(f"Failed to send email: {e}")
+            return False
     
-    def create_email_html(self, alert_content: Dict[str, Any]) -> str:
-        """创建邮件HTML内容"""
-        severity = alert_content.get('severity', 'info')
-        severity_colors = {
-            'critical': '#dc3545',
-            'warning': '#ffc107',
-            'info': '#17a2b8',
-            'success': '#28a745'
+    def _get_secret(self, secret_name: str) -> str:
+        """读取Secret，文件修改时间未变化时直接返回上次读取的值"""
+        try:
+            mtime_ns: Optional[int] = os.stat(f"{self.secrets_dir}/{secret_name}").st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        
+        cached = self._secret_cache.get(secret_name)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        value = config_loader.load_secret(secret_name)
+        self._secret_cache[secret_name] = (mtime_ns, value)
+        return value
+    
+    def _get_email_settings(self) -> Dict[str, Any]:
+        """解析邮件配置，每个实例只解析一次"""
+        if self._email_settings is not None:
+            return self._email_settings
+        
+        email_config = self.config.get('email', {})
+        to_addrs = email_config.get('to', ['admin@example.com'])
+        if isinstance(to_addrs, str):
+            to_addrs = [to_addrs]
+        
+        self._email_settings = {
+            'smtp_server': email_config.get('smtpServer', 'smtp.gmail.com'),
+            'smtp_port': int(email_config.get('smtpPort', 587)),
+            'use_tls': email_config.get('useTLS', True),
+            'use_ssl': email_config.get('useSSL', False),
+            'from_addr': email_config.get('from', 'nodeguardian@example.com'),
+            'to_header': ', '.join(to_addrs)
         }
-        color = severity_colors.get(severity, '#6c757d')
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>NodeGuardian Alert</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                <div style="background-color: {color}; color: white; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
-                    <h1 style="margin: 0; font-size: 24px;">{alert_content.get('title', 'NodeGuardian Alert')}</h1>
-                </div>
-                
-                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin-bottom: 20px;">
-                    <h2 style="margin-top: 0; color: #495057;">Summary</h2>
-                    <p>{alert_content.get('summary', '')}</p>
-                </div>
-                
-                <div style="background-color: #ffffff; padding: 15px; border: 1px solid #dee2e6; border-radius: 5px; margin-bottom: 20px;">
-                    <h3 style="margin-top: 0; color: #495057;">Details</h3>
-                    <p><strong>Rule:</strong> {alert_content.get('ruleName', 'Unknown')}</p>
-                    <p><strong>Description:</strong> {alert_content.get('ruleDescription', 'No description')}</p>
-                    <p><strong>Triggered Nodes:</strong> {', '.join(alert_content.get('triggeredNodes', []))}</p>
-                    <p><strong>Timestamp:</strong> {alert_content.get('timestamp', '')}</p>
-                </div>
-                
-                <div style="background-color: #e9ecef; padding: 15px; border-radius: 5px;">
-                    <h3 style="margin-top: 0; color: #495057;">Full Description</h3>
-                    <p>{alert_content.get('description', '')}</p>
-                </div>
-                
-                <div style="text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #dee2e6; color: #6c757d; font-size: 12px;">
-                    <p>This alert was generated by NodeGuardian</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        return self._email_settings
+    
+    def _get_smtp(self, smtp_server: str, smtp_port: int, use_tls: bool, use_ssl: bool, username: str, password: str) -> smtplib.SMTP:
+        """获取SMTP连接，已建立的连接在有效期内且通过NOOP确认可用时复用"""
+        if self._smtp is not None:
+            try:
+                if time.monotonic() < self._smtp_expires_at and self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp()
         
-        return html
+        if use_ssl:
+            server = smtplib.SMTP_SSL(smtp_server, smtp_port)
+        else:
+            server = smtplib.SMTP(smtp_server, smtp_port)
+            if use_tls:
+                server.starttls()
+        
+        server.login(username, password)
+        self._smtp = server
+        self._smtp_expires_at = time.monotonic() + SMTP_CONNECTION_TTL
+        return server
+    
+    def _close_smtp(self) -> None:
+        """关闭复用的SMTP连接"""
+        if self._smtp is None:
+            return
+        
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+    
+    def create_email_html(self, alert_content: Dict[str, Any]) -> str:
+        """创建邮件HTML内容，只替换模板中的可变字段，字段值经过HTML转义"""
+        severity = alert_content.get('severity', 'info')
+        return _EMAIL_HTML_TEMPLATE.substitute(
+            color=_SEVERITY_COLORS.get(severity, '#6c757d'),
+            title=html.escape(str(alert_content.get('title', 'NodeGuardian Alert'))),
+            summary=html.escape(str(alert_content.get('summary', ''))),
+            rule_name=html.escape(str(alert_content.get('ruleName', 'Unknown'))),
+            rule_description=html.escape(str(alert_content.get('ruleDescription', 'No description'))),
+            triggered_nodes=html.escape(', '.join(alert_content.get('triggeredNodes', []))),
+            timestamp=html.escape(str(alert_content.get('timestamp', ''))),
+            description=html.escape(str(alert_content.get('description', '')))
+        )
     
     def get_current_timestamp(self) -> str:
-        """获取当前时间戳"""
-        from datetime import datetime
-        return datetime.utcnow().isoformat() + "Z"
+        """获取当前UTC时间戳"""
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
 
 def main():
     """主函数"""
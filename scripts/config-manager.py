@@ -4,11 +4,41 @@ NodeGuardian Configuration Manager
 统一配置管理工具
 """
 
-import json
+import functools
 import argparse
 import sys
 import os
-from typing import Dict, Any, Optional
+import re
+from typing import Dict, Any, Tuple
+
+from json_util import dumps_indented, loads
+
+# 匹配每个包含非空白字符的行的行首
+_NON_BLANK_LINE_RE = re.compile(r'^(?=[^\n]*\S)', re.MULTILINE)
+
+
+# 各配置部分的必填字段及缺失时的错误信息，新增必填字段只需修改此表
+_REQUIRED_FIELDS = {
+    "email": (
+        ("smtpServer", "Email SMTP server is required"),
+        ("from", "Email from address is required"),
+        ("to", "Email to addresses are required")
+    ),
+    "prometheus": (
+        ("url", "Prometheus URL is required"),
+    ),
+    "monitoring": (
+        ("defaultCheckInterval", "Default check interval is required"),
+        ("defaultCooldownPeriod", "Default cooldown period is required")
+    )
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _key_path(key: str) -> Tuple[str, ...]:
+    """将点分隔的配置键拆分为路径，批量更新时相同的键只拆分一次"""
+    return tuple(key.split('.'))
+
 
 class ConfigManager:
     """配置管理器"""
@@ -67,15 +97,15 @@ class ConfigManager:
     def load_config(self, config_file: str) -> Dict[str, Any]:
         """加载配置文件"""
         if os.path.exists(config_file):
-            with open(config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(config_file, 'rb') as f:
+                return loads(f.read())
         else:
             return self.config_template.copy()
     
     def save_config(self, config: Dict[str, Any], config_file: str) -> None:
         """保存配置文件"""
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        with open(config_file, 'wb') as f:
+            f.write(dumps_indented(config))
     
     def update_config(self, config: Dict[str, Any], section: str, key: str, value: Any) -> None:
         """更新配置项"""
@@ -83,16 +113,11 @@ class ConfigManager:
             config[section] = {}
         
         # 处理嵌套键 (如 "email.username")
-        if '.' in key:
-            keys = key.split('.')
-            current = config[section]
-            for k in keys[:-1]:
-                if k not in current:
-                    current[k] = {}
-                current = current[k]
-            current[keys[-1]] = value
-        else:
-            config[section][key] = value
+        *parents, last = _key_path(key)
+        current = config[section]
+        for k in parents:
+            current = current.setdefault(k, {})
+        current[last] = value
     
     def get_config(self, config: Dict[str, Any], section: str, key: str, default: Any = None) -> Any:
         """获取配置项"""
@@ -100,44 +125,23 @@ class ConfigManager:
             return default
         
         # 处理嵌套键
-        if '.' in key:
-            keys = key.split('.')
-            current = config[section]
-            for k in keys:
-                if k not in current:
-                    return default
-                current = current[k]
-            return current
-        else:
-            return config[section].get(key, default)
+        current = config[section]
+        for k in _key_path(key):
+            if k not in current:
+                return default
+            current = current[k]
+        return current
     
     def validate_config(self, config: Dict[str, Any]) -> bool:
         """验证配置"""
         errors = []
         
-        # 验证邮件配置
-        if 'email' in config:
-            email_config = config['email']
-            if not email_config.get('smtpServer'):
-                errors.append("Email SMTP server is required")
-            if not email_config.get('from'):
-                errors.append("Email from address is required")
-            if not email_config.get('to'):
-                errors.append("Email to addresses are required")
-        
-        # 验证Prometheus配置
-        if 'prometheus' in config:
-            prometheus_config = config['prometheus']
-            if not prometheus_config.get('url'):
-                errors.append("Prometheus URL is required")
-        
-        # 验证监控配置
-        if 'monitoring' in config:
-            monitoring_config = config['monitoring']
-            if not monitoring_config.get('defaultCheckInterval'):
-                errors.append("Default check interval is required")
-            if not monitoring_config.get('defaultCooldownPeriod'):
-                errors.append("Default cooldown period is required")
+        # 按必填字段表逐项检查，配置中存在的部分才需要验证
+        for section, required_fields in _REQUIRED_FIELDS.items():
+            section_config = config.get(section)
+            if section_config is None:
+                continue
+            errors.extend(message for field, message in required_fields if not section_config.get(field))
         
         if errors:
             print("Configuration validation errors:")
@@ -149,7 +153,7 @@ class ConfigManager:
     
     def generate_k8s_configmap(self, config: Dict[str, Any]) -> str:
         """生成Kubernetes ConfigMap YAML"""
-        config_json = json.dumps(config, indent=2, ensure_ascii=False)
+        config_json = dumps_indented(config).decode('utf-8')
         
         yaml_content = f"""apiVersion: v1
 kind: ConfigMap
@@ -179,21 +183,12 @@ type: Opaque
 data:
 """
         
-        for key, value in secrets.items():
-            yaml_content += f"  {key}: {value}\n"
-        
-        return yaml_content
+        # 一次拼接所有data条目，避免逐条累加字符串
+        return yaml_content + ''.join(f"  {key}: {value}\n" for key, value in secrets.items())
     
     def _indent_yaml(self, text: str, indent: int) -> str:
-        """为YAML内容添加缩进"""
-        lines = text.split('\n')
-        indented_lines = []
-        for line in lines:
-            if line.strip():
-                indented_lines.append(' ' * indent + line)
-            else:
-                indented_lines.append('')
-        return '\n'.join(indented_lines)
+        """为YAML内容添加缩进，一次正则替换完成，空行不缩进"""
+        return _NON_BLANK_LINE_RE.sub(' ' * indent, text)
 
 
 def main():
@@ -270,8 +265,8 @@ def main():
             # 生成Secret（如果提供了secrets文件）
             secret_yaml = ""
             if args.secrets and os.path.exists(args.secrets):
-                with open(args.secrets, 'r', encoding='utf-8') as f:
-                    secrets = json.load(f)
+                with open(args.secrets, 'rb') as f:
+                    secrets = loads(f.read())
                 secret_yaml = "\n---\n" + manager.generate_k8s_secret(secrets)
             
             # 保存到文件
@@ -4,137 +4,220 @@ NodeGuardian Configuration Loader
 统一配置加载模块，支持从ConfigMap和Secret加载配置
 """
 
-import json
+import copy
+import functools
 import os
 import logging
-from typing import Dict, Any, Optional
+import re
+import sys
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from json_util import loads
 
 logger = logging.getLogger(__name__)
 
+# 时长格式为整数加可选单位后缀，如 "30s"、"5m"，没有后缀时按秒计
+_DURATION_RE = re.compile(r'(\d+)([smhd]?)')
+
+# 时长后缀对应的秒数
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# 默认配置，模块加载时构建一次
+_DEFAULT_CONFIG = {
+    "email": {
+        "smtpServer": "smtp.gmail.com",
+        "smtpPort": 587,
+        "username": "",
+        "password": "",
+        "from": "nodeguardian@example.com",
+        "to": ["admin@example.com"],
+        "useTLS": True,
+        "useSSL": False
+    },
+    "prometheus": {
+        "url": "http://prometheus-k8s.monitoring.svc:9090",
+        "timeout": "30s",
+        "retries": 3,
+        "queryTimeout": "60s",
+        "maxSamples": 10000
+    },
+    "alert": {
+        "webhookUrl": "",
+        "defaultChannels": ["log", "email"],
+        "retryAttempts": 3,
+        "retryDelay": "5s",
+        "batchSize": 10,
+        "batchTimeout": "30s"
+    },
+    "monitoring": {
+        "defaultCheckInterval": "30s",
+        "defaultCooldownPeriod": "10m",
+        "metricsServerUrl": "https://kubernetes.default.svc:443/apis/metrics.k8s.io/v1beta1",
+        "maxConcurrentChecks": 10,
+        "healthCheckInterval": "60s"
+    },
+    "log": {
+        "level": "INFO",
+        "format": "json",
+        "output": "stdout",
+        "maxSize": "100MB",
+        "maxBackups": 3,
+        "maxAge": "7d"
+    },
+    "node": {
+        "defaultTaintKey": "nodeguardian.io/status",
+        "defaultTaintEffect": "NoSchedule",
+        "defaultLabelPrefix": "nodeguardian.io/",
+        "excludeNamespaces": ["kube-system", "kube-public", "monitoring"],
+        "maxEvictionPods": 10
+    },
+    "python": {
+        "enabled": True,
+        "scriptsPath": "/scripts",
+        "logLevel": "INFO",
+        "timeout": "300s",
+        "maxRetries": 3
+    }
+}
+
+# 合并到配置中的Secret: (Secret名, 配置部分, 配置键)
+_SECRET_FIELDS = (
+    ("email-username", "email", "username"),
+    ("email-password", "email", "password"),
+    ("webhook-url", "alert", "webhookUrl")
+)
+
+def _read_secret_file(path: str) -> str:
+    """读取Secret文件内容并去除首尾空白，Secret文件通常很小，直接使用文件描述符读取，不创建缓冲和文本包装对象"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b''.join(chunks).decode('utf-8').strip()
+
 class ConfigLoader:
     """配置加载器"""
     
+    # 进程内只有一个全局实例，固定属性集合，属性访问不经过实例字典
+    __slots__ = (
+        "config_dir", "secrets_dir", "config_file", "_config_cache", "_lock",
+        "_fingerprint", "_raw_config", "_secrets", "_flat"
+    )
+    
     def __init__(self):
         self.config_dir = "/etc/nodeguardian/config"
         self.secrets_dir = "/etc/nodeguardian/secrets"
         self.config_file = f"{self.config_dir}/config.json"
         self._config_cache = None
+        
+        # 保证并发首次加载时只有一个线程读取和解析配置，已缓存时读取无需加锁
+        self._lock = threading.Lock()
+        
+        # 生成缓存时配置文件和Secret文件的修改时间与大小，重新加载时未变化则无需重新解析
+        self._fingerprint: Optional[Tuple] = None
+        
+        # 原始配置和Secret分别缓存: (修改时间与大小, 内容)，只有一方变化时另一方无需重新读取
+        self._raw_config: Optional[Tuple[Any, Dict[str, Any]]] = None
+        self._secrets: Optional[Tuple[Any, Dict[str, str]]] = None
+        
+        # 展开时对应的配置对象和展开后的配置值 (部分, 键) -> 值，作为一个元组整体替换，配置重新加载后重新展开
+        self._flat: Tuple[Optional[Dict[str, Any]], Dict[Tuple[str, str], Any]] = (None, {})
     
     def load_config(self) -> Dict[str, Any]:
-        """加载统一配置文件"""
-        if self._config_cache is not None:
+        """加载统一配置文件，已缓存时直接返回，未缓存时加锁后再次检查，并发调用只解析一次"""
+        config = self._config_cache
+        if config is not None:
+            return config
+        
+        with self._lock:
+            if self._config_cache is None:
+                self._config_cache = self._read_config()
             return self._config_cache
+    
+    def _read_config(self) -> Dict[str, Any]:
+        """读取配置并合并敏感信息，配置文件和Secret分别缓存，只重新读取发生变化的部分"""
+        config_fingerprint, secrets_fingerprint = self._fingerprint = self._compute_fingerprint()
         
+        if self._raw_config is None or self._raw_config[0] != config_fingerprint:
+            self._raw_config = (config_fingerprint, self.read_config_file())
+        if self._secrets is None or self._secrets[0] != secrets_fingerprint:
+            self._secrets = (secrets_fingerprint, self.load_secret_files(tuple(secret_name for secret_name, _, _ in _SECRET_FIELDS)))
+        
+        return self.merge_secrets(self._raw_config[1], self._secrets[1])
+    
+    def read_config_file(self) -> Dict[str, Any]:
+        """读取配置文件，不存在或解析失败时返回默认配置"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-            else:
-                # 返回默认配置
-                config = self.get_default_config()
-            
-            # 加载敏感信息
-            config = self.load_secrets(config)
-            
-            self._config_cache = config
-            return config
-            
-        except Exception as e:
-            logger.error(f"Failed to load config: {e}")
+            # 直接读取整个文件，不存在时使用默认配置，无需先单独检查
+            with open(self.config_file, 'rb') as f:
+                config = loads(f.read())
+        except FileNotFoundError:
+            return self.get_default_config()
+        except (OSError, ValueError) as e:
+            # JSON解析错误和编码错误均为ValueError的子类
+            logger.error("Failed to load config: %s", e)
+            # 同样缓存默认配置，配置文件修改前不再重新读取损坏的文件
+            return self.get_default_config()
+        
+        if not isinstance(config, dict):
+            logger.error("Failed to load config: expected a JSON object, got %s", type(config).__name__)
             return self.get_default_config()
+        return config
     
     def get_default_config(self) -> Dict[str, Any]:
-        """获取默认配置"""
-        return {
-            "email": {
-                "smtpServer": "smtp.gmail.com",
-                "smtpPort": 587,
-                "username": "",
-                "password": "",
-                "from": "nodeguardian@example.com",
-                "to": ["admin@example.com"],
-                "useTLS": True,
-                "useSSL": False
-            },
-            "prometheus": {
-                "url": "http://prometheus-k8s.monitoring.svc:9090",
-                "timeout": "30s",
-                "retries": 3,
-                "queryTimeout": "60s",
-                "maxSamples": 10000
-            },
-            "alert": {
-                "webhookUrl": "",
-                "defaultChannels": ["log", "email"],
-                "retryAttempts": 3,
-                "retryDelay": "5s",
-                "batchSize": 10,
-                "batchTimeout": "30s"
-            },
-            "monitoring": {
-                "defaultCheckInterval": "30s",
-                "defaultCooldownPeriod": "10m",
-                "metricsServerUrl": "https://kubernetes.default.svc:443/apis/metrics.k8s.io/v1beta1",
-                "maxConcurrentChecks": 10,
-                "healthCheckInterval": "60s"
-            },
-            "log": {
-                "level": "INFO",
-                "format": "json",
-                "output": "stdout",
-                "maxSize": "100MB",
-                "maxBackups": 3,
-                "maxAge": "7d"
-            },
-            "node": {
-                "defaultTaintKey": "nodeguardian.io/status",
-                "defaultTaintEffect": "NoSchedule",
-                "defaultLabelPrefix": "nodeguardian.io/",
-                "excludeNamespaces": ["kube-system", "kube-public", "monitoring"],
-                "maxEvictionPods": 10
-            },
-            "python": {
-                "enabled": True,
-                "scriptsPath": "/scripts",
-                "logLevel": "INFO",
-                "timeout": "300s",
-                "maxRetries": 3
-            }
-        }
+        """获取默认配置，返回副本，调用方可以直接修改"""
+        return copy.deepcopy(_DEFAULT_CONFIG)
+    
+    def merge_secrets(self, config: Dict[str, Any], secrets: Dict[str, str]) -> Dict[str, Any]:
+        """将敏感信息合并到配置的副本中，只复制被修改的部分，缓存的原始配置保持不变"""
+        merged = dict(config)
+        copied_sections = set()
+        for secret_name, section, key in _SECRET_FIELDS:
+            value = secrets.get(secret_name)
+            if not value:
+                continue
+            if section not in copied_sections:
+                section_config = merged.get(section)
+                merged[section] = dict(section_config) if isinstance(section_config, dict) else {}
+                copied_sections.add(section)
+            merged[section][key] = value
+        return merged
     
-    def load_secrets(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """加载Secret配置"""
+    def load_secret_files(self, secret_names: Tuple[str, ...]) -> Dict[str, str]:
+        """扫描一次Secret目录，读取其中存在的指定Secret，不存在的Secret不会出现在结果中"""
         try:
-            # 加载邮件凭据
-            email_username = self.load_secret("email-username")
-            email_password = self.load_secret("email-password")
-            
-            if email_username:
-                config["email"]["username"] = email_username
-            if email_password:
-                config["email"]["password"] = email_password
-            
-            # 加载webhook URL
-            webhook_url = self.load_secret("webhook-url")
-            if webhook_url:
-                config["alert"]["webhookUrl"] = webhook_url
-            
-            return config
-            
-        except Exception as e:
-            logger.error(f"Failed to load secrets: {e}")
-            return config
+            with os.scandir(self.secrets_dir) as entries:
+                secret_paths = [(entry.name, entry.path) for entry in entries if entry.name in secret_names and entry.is_file()]
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            # 目录不可读等错误不应导致所有钩子在导入时失败，按无Secret处理
+            logger.error("Failed to scan secrets directory %s: %s", self.secrets_dir, e)
+            return {}
+        
+        secrets = {}
+        for secret_name, secret_path in secret_paths:
+            try:
+                secrets[secret_name] = _read_secret_file(secret_path)
+            except (OSError, ValueError) as e:
+                logger.error("Failed to load secret %s: %s", secret_name, e)
+        return secrets
     
     def load_secret(self, secret_name: str) -> str:
         """加载单个Secret"""
         try:
-            secret_file = f"{self.secrets_dir}/{secret_name}"
-            if os.path.exists(secret_file):
-                with open(secret_file, 'r') as f:
-                    return f.read().strip()
+            return _read_secret_file(f"{self.secrets_dir}/{secret_name}")
+        except FileNotFoundError:
             return ""
-        except Exception as e:
-            logger.error(f"Failed to load secret {secret_name}: {e}")
+        except (OSError, ValueError) as e:
+            logger.error("Failed to load secret %s: %s", secret_name, e)
             return ""
     
     def get_config_section(self, section: str) -> Dict[str, Any]:
@@ -143,14 +226,51 @@ class ConfigLoader:
         return config.get(section, {})
     
     def get_config_value(self, section: str, key: str, default: Any = None) -> Any:
-        """获取配置值"""
-        section_config = self.get_config_section(section)
-        return section_config.get(key, default)
+        """获取配置值，在展开的配置表上一次查找完成"""
+        config = self.load_config()
+        flat_source, flat_config = self._flat
+        if flat_source is not config:
+            # 驻留解析得到的部分名和键名，与调用方传入的字面量比较时可直接按对象判断相等
+            flat_config = {
+                (sys.intern(section_name), sys.intern(key_name)): value
+                for section_name, section_config in config.items() if isinstance(section_config, dict)
+                for key_name, value in section_config.items()
+            }
+            self._flat = (config, flat_config)
+        return flat_config.get((section, key), default)
     
     def reload_config(self) -> Dict[str, Any]:
-        """重新加载配置"""
-        self._config_cache = None
-        return self.load_config()
+        """重新加载配置，配置文件和Secret文件均未变化时直接返回缓存"""
+        with self._lock:
+            config = self._config_cache
+            if config is not None and self._compute_fingerprint() == self._fingerprint:
+                return config
+            
+            self._config_cache = self._read_config()
+            return self._config_cache
+    
+    def _compute_fingerprint(self) -> Tuple:
+        """获取配置文件和Secret目录下各文件的修改时间与大小，Secret目录只扫描一次"""
+        try:
+            stat = os.stat(self.config_file)
+            config_fingerprint: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            config_fingerprint = None
+        
+        secret_fingerprints = []
+        try:
+            with os.scandir(self.secrets_dir) as entries:
+                for entry in entries:
+                    try:
+                        # Secret卷中的文件是符号链接，跟随链接获取实际文件的状态
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    secret_fingerprints.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            pass
+        
+        return (config_fingerprint, tuple(sorted(secret_fingerprints)))
 
 # 全局配置加载器实例
 config_loader = ConfigLoader()
@@ -170,3 +290,12 @@ def get_config_value(section: str, key: str, default: Any = None) -> Any:
 def reload_config() -> Dict[str, Any]:
     """重新加载配置"""
     return config_loader.reload_config()
+
+@functools.lru_cache(maxsize=256)
+def parse_duration(value: str, default: float) -> float:
+    """将"30s"、"5m"、"1h"、"1d"形式的时长解析为秒数，无法解析时返回默认值，结果按输入缓存"""
+    match = _DURATION_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        return default
+    
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2)]
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+NodeGuardian JSON工具
+各脚本共用的JSON编解码和状态文件写入，安装了orjson时优先使用orjson
+"""
+
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
+
+def loads(data: Union[bytes, str]) -> Any:
+    """解析JSON，优先使用orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj: Any) -> bytes:
+    """将对象序列化为紧凑的UTF-8 JSON字节串，非ASCII字符原样保留，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+def dumps_indented(obj: Any) -> bytes:
+    """将对象序列化为缩进的UTF-8 JSON字节串，非ASCII字符原样保留，优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+def write_file_atomic(path: str, body: bytes) -> bool:
+    """将内容写入文件，内容未变化时不写入，返回是否写入了文件"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == body:
+                return False
+    except FileNotFoundError:
+        pass
+    
+    # 先写临时文件再原子替换，其他进程不会读到写了一半的文件；临时文件名带进程号，多个进程同时写入时互不覆盖
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+NodeGuardian Kubernetes Client
+基于kubectl的Kubernetes访问封装，控制器和恢复管理器共享同一实例
+"""
+
+import json
+import logging
+import operator
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional
+
+from json_util import loads
+
+logger = logging.getLogger(__name__)
+
+# 节点名称须符合DNS-1123子域名规范
+_NODE_NAME_RE = re.compile(r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*$')
+
+# 批量节点资源使用的有效期（秒），同一次调度中多个规则共用一次kubectl top结果
+NODE_USAGE_TTL = 15
+
+# 节点列表的有效期（秒），有效期内的节点查询直接使用本地缓存
+NODE_LIST_TTL = 15
+
+# kubectl错误输出中表示API Server暂时不可用的特征
+_TRANSIENT_ERROR_MARKERS = (
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalError",
+    "the server is currently unable to handle the request",
+    "Unable to connect to the server",
+    "connection refused",
+    "i/o timeout",
+    "TLS handshake timeout"
+)
+
+class TransientKubeError(Exception):
+    """API Server暂时不可用（限流、5xx或连接失败），调用方应放弃本轮处理，等待下次调度"""
+
+class KubernetesClient:
+    """kubectl命令封装"""
+    
+    def __init__(self, kubectl: str = "kubectl", usage_ttl: float = NODE_USAGE_TTL, node_list_ttl: float = NODE_LIST_TTL):
+        self.kubectl = kubectl
+        self.usage_ttl = usage_ttl
+        self.node_list_ttl = node_list_ttl
+        
+        # 节点列表缓存: 节点名 -> 节点对象
+        self._nodes: Dict[str, Dict[str, Any]] = {}
+        self._nodes_loaded_at: Optional[float] = None
+        self._nodes_lock = threading.Lock()
+        
+        # 批量获取的节点资源使用: 节点名 -> kubectl top输出列
+        self._node_usage: Dict[str, List[str]] = {}
+        self._usage_loaded = False
+        self._usage_loaded_at = 0.0
+        self._usage_lock = threading.Lock()
+    
+    def run(self, args: List[str]) -> str:
+        """执行kubectl命令并返回标准输出，API Server暂时不可用时抛出TransientKubeError，其他失败抛出CalledProcessError"""
+        try:
+            result = subprocess.run([self.kubectl] + args, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            stderr = e.stderr or ""
+            if any(marker in stderr for marker in _TRANSIENT_ERROR_MARKERS):
+                raise TransientKubeError(stderr.strip()) from e
+            raise
+        return result.stdout
+    
+    def get_node_names(self, node_selector: Dict[str, Any]) -> List[str]:
+        """获取匹配节点选择器的节点名称，在缓存的节点列表上本地匹配标签，多个规则共用一次LIST"""
+        node_names = node_selector.get('nodeNames') if node_selector else None
+        if node_names:
+            # 直接指定节点名称时无需获取节点列表，名称会作为kubectl参数传递，先过滤非法名称
+            valid_names = [node_name for node_name in node_names if is_valid_node_name(node_name)]
+            if len(valid_names) != len(node_names):
+                logger.warning(f"Ignoring invalid node names in nodeNames: {[n for n in node_names if not is_valid_node_name(n)]}")
+            return valid_names
+        
+        matcher = compile_label_matcher(node_selector)
+        if matcher is None:
+            # 无法识别的选择器不能忽略，否则规则会匹配所有节点，对整个集群执行污点、驱逐等动作
+            logger.warning(f"Unsupported node selector, matching no nodes: {node_selector}")
+            return []
+        return [node_name for node_name, node in self.list_nodes().items() if matcher(node['metadata']['labels'])]
+    
+    def list_nodes(self) -> Dict[str, Dict[str, Any]]:
+        """获取所有节点对象，有效期内返回缓存，多个规则和节点的查询共用一次LIST"""
+        with self._nodes_lock:
+            if self._nodes_loaded_at is not None and time.monotonic() - self._nodes_loaded_at < self.node_list_ttl:
+                return self._nodes
+            
+            nodes_data = loads(self.run(["get", "nodes", "-o", "json"]))
+            self._nodes = {}
+            for node in nodes_data.get('items', []):
+                node = _slim_node(node)
+                self._nodes[node['metadata']['name']] = node
+            self._nodes_loaded_at = time.monotonic()
+            return self._nodes
+    
+    def invalidate_nodes(self) -> None:
+        """节点被修改后使节点列表缓存失效"""
+        with self._nodes_lock:
+            self._nodes_loaded_at = None
+    
+    def get_node(self, node_name: str) -> Dict[str, Any]:
+        """获取单个节点对象，优先从节点列表缓存读取"""
+        node = self.list_nodes().get(node_name)
+        if node is not None:
+            return node
+        
+        # 缓存之后新加入的节点
+        return _slim_node(loads(self.run(["get", "node", node_name, "-o", "json"])))
+    
+    def merge_patch_node(self, node_name: str, patch: Dict[str, Any]) -> None:
+        """以JSON merge patch只提交变更的字段，值为None的键会被删除"""
+        try:
+            self.run(["patch", "node", node_name, "--type=merge", "--patch", json.dumps(patch)])
+        finally:
+            self.invalidate_nodes()
+    
+    def taint_nodes(self, node_names: List[str], taint_key: str, taint_value: str, taint_effect: str) -> None:
+        """通过一次kubectl调用为多个节点添加污点"""
+        try:
+            self.run(["taint", "nodes"] + node_names + [f"{taint_key}={taint_value}:{taint_effect}", "--overwrite"])
+        finally:
+            self.invalidate_nodes()
+    
+    def label_nodes(self, node_names: List[str], labels: Dict[str, str]) -> None:
+        """通过一次kubectl调用为多个节点添加标签"""
+        try:
+            self.run(["label", "nodes"] + node_names + [f"{key}={value}" for key, value in labels.items()] + ["--overwrite"])
+        finally:
+            self.invalidate_nodes()
+    
+    def annotate_nodes(self, node_names: List[str], annotations: Dict[str, str]) -> None:
+        """通过一次kubectl调用为多个节点添加注解"""
+        self.run(["annotate", "nodes"] + node_names + [f"{key}={value}" for key, value in annotations.items()] + ["--overwrite"])
+    
+    def remove_node_taint(self, node_name: str, taint_key: str, taint_effect: str) -> None:
+        """移除节点污点"""
+        try:
+            self.run(["taint", "nodes", node_name, f"{taint_key}:{taint_effect}-"])
+        finally:
+            self.invalidate_nodes()
+    
+    def refresh_node_usage(self) -> Dict[str, Dict[str, float]]:
+        """通过一次kubectl top nodes获取所有节点的资源使用，有效期内直接返回上次结果"""
+        with self._usage_lock:
+            if self._usage_loaded and time.monotonic() - self._usage_loaded_at < self.usage_ttl:
+                return self._node_usage
+            
+            try:
+                output = self.run(["top", "nodes", "--no-headers"])
+            except (subprocess.CalledProcessError, OSError) as e:
+                # 指标服务不可用时单个节点的查询同样会失败，有效期内按没有任何节点指标处理，
+                # 不再由每个规则重试批量查询，也不逐个节点调用kubectl top
+                logger.error(f"Failed to get node usage: {e}")
+                output = ""
+            
+            usage = {}
+            for line in output.splitlines():
+                node_usage = _parse_top_line(line)
+                if node_usage is not None:
+                    usage[line.split(None, 1)[0]] = node_usage
+            self._node_usage = usage
+            self._usage_loaded = True
+            self._usage_loaded_at = time.monotonic()
+            return usage
+    
+    def get_node_usage(self, node_name: str) -> Optional[Dict[str, float]]:
+        """获取单个节点的资源使用，CPU和内存指标共用同一次解析结果，优先使用批量结果"""
+        node_usage = self._node_usage.get(node_name)
+        if node_usage is not None:
+            return node_usage
+        
+        # 批量查询已执行但结果不包含该节点时，说明节点暂无指标或指标服务不可用，无需再单独查询
+        if self._usage_loaded:
+            return None
+        
+        # 单独查询的结果也缓存下来，同一节点的CPU和内存指标只调用一次kubectl
+        node_usage = _parse_top_line(self.run(["top", "node", node_name, "--no-headers"]))
+        if node_usage is not None:
+            self._node_usage[node_name] = node_usage
+        return node_usage
+
+def _slim_node(node: Dict[str, Any]) -> Dict[str, Any]:
+    """只保留调用方使用的节点字段，丢弃status中的镜像列表等大字段"""
+    metadata = node.get('metadata', {})
+    return {
+        "metadata": {
+            "name": metadata.get('name'),
+            "labels": metadata.get('labels') or {}
+        },
+        "spec": {
+            "taints": node.get('spec', {}).get('taints') or []
+        }
+    }
+
+def _parse_top_line(line: str) -> Optional[Dict[str, float]]:
+    """解析kubectl top node的一行输出，节点暂无指标（如 <unknown>）时返回None"""
+    # 输出格式通常是: "node-name 100m 5% 1Gi 30%"，依次为CPU核数、CPU使用率、内存用量、内存使用率
+    parts = line.split()
+    if len(parts) < 5:
+        return None
+    
+    try:
+        return {
+            "cpuPercent": float(parts[2].rstrip('%')),
+            "memoryPercent": float(parts[4].rstrip('%'))
+        }
+    except ValueError:
+        return None
+
+def _compile_expression(expression: Any) -> Optional[Callable[[Dict[str, str]], bool]]:
+    """将单个matchExpressions表达式编译为标签匹配函数，操作符或参数无效时返回None"""
+    if not isinstance(expression, dict):
+        return None
+    key = expression.get('key')
+    operator_name = expression.get('operator')
+    values = expression.get('values') or []
+    if not isinstance(key, str) or not isinstance(values, list):
+        return None
+    
+    if operator_name == "In" and values:
+        value_set = frozenset(values)
+        return lambda labels: labels.get(key) in value_set
+    if operator_name == "NotIn" and values:
+        value_set = frozenset(values)
+        return lambda labels: labels.get(key) not in value_set
+    if operator_name == "Exists" and not values:
+        return lambda labels: key in labels
+    if operator_name == "DoesNotExist" and not values:
+        return lambda labels: key not in labels
+    if operator_name in ("Gt", "Lt") and len(values) == 1:
+        # 与Kubernetes一致，Gt/Lt按整数比较，标签不存在或不是整数时不匹配
+        try:
+            threshold = int(values[0])
+        except (TypeError, ValueError):
+            return None
+        compare = operator.gt if operator_name == "Gt" else operator.lt
+        
+        def match(labels: Dict[str, str]) -> bool:
+            try:
+                return compare(int(labels[key]), threshold)
+            except (KeyError, ValueError):
+                return False
+        return match
+    
+    return None
+
+def compile_label_matcher(node_selector: Optional[Dict[str, Any]]) -> Optional[Callable[[Dict[str, str]], bool]]:
+    """将节点选择器编译为标签匹配函数，matchLabels和matchExpressions都为空时才匹配所有节点，存在无法识别的表达式时返回None"""
+    node_selector = node_selector or {}
+    match_labels = node_selector.get('matchLabels') or {}
+    match_expressions = node_selector.get('matchExpressions') or []
+    if not isinstance(match_labels, dict) or not isinstance(match_expressions, list):
+        return None
+    
+    # matchLabels展开为(键, 值)元组逐个做相等比较，matchExpressions逐个编译
+    label_pairs = tuple(match_labels.items())
+    expression_matchers = [_compile_expression(expression) for expression in match_expressions]
+    if any(matcher is None for matcher in expression_matchers):
+        return None
+    
+    if not label_pairs and not expression_matchers:
+        return lambda labels: True
+    
+    # 常见的单标签选择器使用专门的实现
+    if len(label_pairs) == 1 and not expression_matchers:
+        (key, value), = label_pairs
+        return lambda labels: labels.get(key) == value
+    
+    if not label_pairs and len(expression_matchers) == 1:
+        return expression_matchers[0]
+    
+    return lambda labels: all(labels.get(key) == value for key, value in label_pairs) and all(matcher(labels) for matcher in expression_matchers)
+
+def is_valid_node_name(node_name: Any) -> bool:
+    """检查节点名称是否为合法的DNS-1123子域名"""
+    return isinstance(node_name, str) and len(node_name) <= 253 and _NODE_NAME_RE.match(node_name) is not None
+
+_shared_client: Optional[KubernetesClient] = None
+
+def get_kube_client() -> KubernetesClient:
+    """获取进程内共享的KubernetesClient"""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = KubernetesClient()
+    return _shared_client
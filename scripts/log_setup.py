@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+NodeGuardian Logging Setup
+根据统一配置中的log部分初始化日志，支持文本和JSON两种格式
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from json_util import orjson
+
+# 导入时选定编码函数，格式化每条日志时无需再判断
+if orjson is not None:
+    def _encode_json(entry: Dict[str, Any]) -> str:
+        return orjson.dumps(entry).decode('utf-8')
+else:
+    def _encode_json(entry: Dict[str, Any]) -> str:
+        return json.dumps(entry, ensure_ascii=False)
+
+TEXT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        
+        return _encode_json(entry)
+
+
+def setup_logging(log_config: Optional[Dict[str, Any]] = None) -> None:
+    """初始化根日志器，重复调用时不会重复添加处理器"""
+    log_config = log_config or {}
+    level_name = str(log_config.get('level') or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    level = getattr(logging, level_name, logging.INFO)
+    
+    root = logging.getLogger()
+    root.setLevel(level)
+    if root.handlers:
+        return
+    
+    # 与hook的shell日志一致输出到stderr，stdout保留给hook配置输出
+    handler = logging.StreamHandler(sys.stderr)
+    if log_config.get('format') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_LOG_FORMAT))
+    
+    # 调用线程只把日志放入队列，由后台线程负责格式化和写出，避免慢速输出阻塞kubectl和网络调用
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
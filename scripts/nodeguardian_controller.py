@@ -9,23 +9,29 @@ import os
 import sys
 import logging
 import subprocess
-from typing import Dict, List, Any, Optional
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 
-# 导入配置加载器
-from config_loader import get_config
+# 导入配置加载器和日志初始化
+from config_loader import get_config, get_config_section, parse_duration
+from log_setup import setup_logging
+from kube_client import KubernetesClient, TransientKubeError, get_kube_client, is_valid_node_name
+from json_util import dumps_indented, loads, write_file_atomic
+from rule_common import CooldownStore, ParsedCondition, get_matching_nodes, parse_conditions
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(get_config_section('log'))
 logger = logging.getLogger(__name__)
 
+# NodeGuardian所在命名空间，进程启动时从环境变量解析一次
+NODEGUARDIAN_NAMESPACE = os.environ.get('NODEGUARDIAN_NAMESPACE', 'nodeguardian-system')
+
 class NodeGuardianController:
     """NodeGuardian主控制器"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, kube_client: Optional[KubernetesClient] = None):
         self.config_dir = "/etc/nodeguardian/config"
         self.secrets_dir = "/etc/nodeguardian/secrets"
         self.config_file = f"{self.config_dir}/config.json"
@@ -36,10 +42,38 @@ class NodeGuardianController:
         # 确保目录存在
         Path(self.rules_dir).mkdir(parents=True, exist_ok=True)
         Path(self.templates_dir).mkdir(parents=True, exist_ok=True)
-        Path(self.cooldown_dir).mkdir(parents=True, exist_ok=True)
         
-        # 加载配置
-        self.config = get_config()
+        # 加载配置，调用方可传入已加载的配置
+        self.config = config if config is not None else get_config()
+        
+        # 并发检查节点的最大线程数，构造时解析一次
+        self.max_concurrent_checks = max(1, int(self.config.get('monitoring', {}).get('maxConcurrentChecks', 10)))
+        
+        # 与恢复管理器共享的Kubernetes客户端
+        self.kube_client = kube_client or get_kube_client()
+        
+        # 指标名称到获取函数的映射，构造时绑定一次
+        self._metric_getters: Dict[str, Callable[[str], Optional[float]]] = {
+            "cpuUtilizationPercent": self.get_node_cpu_utilization,
+            "memoryUtilizationPercent": self.get_node_memory_utilization,
+            "diskUtilizationPercent": self.get_node_disk_utilization,
+            "cpuLoadRatio": self.get_node_cpu_load_ratio
+        }
+        
+        # 规则文件缓存: 文件路径 -> (修改时间, 规则对象, JSON文本)，文件未修改时不重新解析
+        self._rule_files: Dict[str, Tuple[int, Dict[str, Any], str]] = {}
+        
+        # 规则的JSON文本缓存: 规则名 -> (规则对象, JSON文本)
+        self._serialized_rules: Dict[str, Tuple[Dict[str, Any], str]] = {}
+        
+        # 冷却期记录，首次检查时扫描一次冷却期目录
+        self.cooldowns = CooldownStore(self.cooldown_dir)
+        
+        # 构造时确定是否输出调试日志，热路径上关闭调试时不构造日志参数
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # 后台运行的告警进程，在本次处理结束前统一回收
+        self._alert_processes: List[subprocess.Popen] = []
     
     def run(self, args: List[str]) -> None:  # pylint: disable=unused-argument
         """主运行函数"""
@@ -78,6 +112,8 @@ class NodeGuardianController:
         except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
             logger.error(f"Error in main run: {e}")
             sys.exit(1)
+        finally:
+            self.wait_for_alerts()
     
     def handle_startup(self) -> None:
         """处理启动事件"""
@@ -171,8 +207,7 @@ class NodeGuardianController:
         
         # 保存规则到文件
         rule_file = f"{self.rules_dir}/{rule_name}.json"
-        with open(rule_file, 'w') as f:
-            json.dump(rule_object, f, indent=2)
+        self.save_json_file(rule_file, rule_object)
         
         # 更新状态
         self.update_rule_status(rule_name, "Active", "", [])
@@ -185,12 +220,13 @@ class NodeGuardianController:
         
         # 删除规则文件
         rule_file = f"{self.rules_dir}/{rule_name}.json"
-        if os.path.exists(rule_file):
+        try:
             os.remove(rule_file)
+        except FileNotFoundError:
+            pass
         
         # 清理冷却期文件
-        for cooldown_file in Path(self.cooldown_dir).glob(f"{rule_name}_*"):
-            cooldown_file.unlink()
+        self.cooldowns.clear_rule(rule_name)
         
         # 更新状态
         self.update_rule_status(rule_name, "Inactive", "Rule deleted", [])
@@ -204,8 +240,7 @@ class NodeGuardianController:
         
         # 保存模板到文件
         template_file = f"{self.templates_dir}/{template_name}.json"
-        with open(template_file, 'w') as f:
-            json.dump(template_object, f, indent=2)
+        self.save_json_file(template_file, template_object)
         
         logger.info(f"Alert template registered: {template_name}")
     
@@ -215,138 +250,168 @@ class NodeGuardianController:
         
         # 删除模板文件
         template_file = f"{self.templates_dir}/{template_name}.json"
-        if os.path.exists(template_file):
+        try:
             os.remove(template_file)
+        except FileNotFoundError:
+            pass
         
         logger.info(f"Alert template unregistered: {template_name}")
     
+    def save_json_file(self, path: str, obj: Dict[str, Any]) -> bool:
+        """将对象保存为JSON文件，内容未变化时不写入，返回是否写入了文件"""
+        return write_file_atomic(path, dumps_indented(obj))
+    
     def evaluate_all_rules(self) -> None:
         """评估所有规则"""
-        if not os.path.exists(self.rules_dir):
+        try:
+            with os.scandir(self.rules_dir) as entries:
+                rule_files = [entry.path for entry in entries if entry.name.endswith('.json') and entry.is_file()]
+        except FileNotFoundError:
+            return
+        
+        if not rule_files:
             return
         
         logger.debug("Evaluating all active rules...")
         
-        for rule_file in Path(self.rules_dir).glob("*.json"):
-            if rule_file.is_file():
-                rule_name = rule_file.stem
-                self.evaluate_rule(str(rule_file))
-    
-    def evaluate_rule(self, rule_file: str) -> None:
-        """评估单个规则"""
+        # 本轮评估中各规则共用的节点选择器匹配结果
+        selector_cache: Dict[str, List[str]] = {}
+        
+        # 规则按顺序评估，只在节点一级并发，所有规则共用同一个线程池，线程数不超过max_concurrent_checks
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_checks) as executor:
+            try:
+                for rule_file in rule_files:
+                    result = self.evaluate_rule(rule_file, selector_cache, executor)
+                    if result is not None:
+                        self.apply_rule_result(rule_file, *result)
+            except TransientKubeError as e:
+                # API Server不可用时其余规则同样会失败，放弃本轮评估等待下次调度
+                logger.warning(f"Kubernetes API temporarily unavailable, skipping remaining rules: {e}")
+    
+    def evaluate_rule(self, rule_file: str, selector_cache: Optional[Dict[str, List[str]]] = None, executor: Optional[ThreadPoolExecutor] = None) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """评估单个规则，返回规则对象和触发的节点，没有节点触发时返回None；传入executor时各节点在其中并发评估"""
         try:
-            with open(rule_file, 'r') as f:
-                rule_object = json.load(f)
+            rule_object, rule_json = self.load_rule(rule_file)
             
             rule_name = rule_object.get('metadata', {}).get('name')
+            # 保留规则文件原文，发送告警时无需重新序列化
+            self._serialized_rules[rule_name] = (rule_object, rule_json)
             rule_enabled = rule_object.get('spec', {}).get('metadata', {}).get('enabled', True)
             
             if not rule_enabled:
-                return
+                return None
             
-            logger.debug(f"Evaluating rule: {rule_name}")
+            if self._debug:
+                logger.debug("Evaluating rule: %s", rule_name)
             
             # 获取节点选择器
             node_selector = rule_object.get('spec', {}).get('nodeSelector', {})
-            matching_nodes = self.get_matching_nodes(node_selector)
+            matching_nodes = get_matching_nodes(self.kube_client, node_selector, selector_cache)
             
             if not matching_nodes:
                 logger.warning(f"No matching nodes found for rule: {rule_name}")
-                return
+                return None
+            
+            # 一次性获取所有节点的资源使用，避免逐节点调用kubectl top
+            self.kube_client.refresh_node_usage()
+            
+            # 冷却期每个规则只解析一次，所有节点共用
+            cooldown_period = rule_object.get('spec', {}).get('monitoring', {}).get('cooldownPeriod', '5m')
+            cooldown_seconds = parse_duration(cooldown_period, 300)  # 默认5分钟
+            
+            # 条件每个规则只解析一次，所有节点共用
+            conditions = parse_conditions(rule_object.get('spec', {}).get('conditions', []))
             
-            # 评估每个节点
-            triggered_nodes = []
-            for node_name in matching_nodes:
-                if self.evaluate_node_for_rule(rule_object, node_name):
-                    triggered_nodes.append(node_name)
+            # 评估每个节点，各节点的指标获取相互独立，在调用方的线程池中并发执行
+            evaluate_node = lambda node_name: self.evaluate_node_for_rule(rule_object, node_name, cooldown_seconds, conditions)
+            results = executor.map(evaluate_node, matching_nodes) if executor is not None else map(evaluate_node, matching_nodes)
+            triggered_nodes = [node_name for node_name, triggered in zip(matching_nodes, results) if triggered]
             
-            # 如果有节点触发，执行动作
             if triggered_nodes:
-                self.execute_rule_actions(rule_object, triggered_nodes)
-                self.update_rule_status(rule_name, "Active", "Rule triggered", triggered_nodes)
+                return rule_object, triggered_nodes
                 
+        except TransientKubeError:
+            raise
         except Exception as e:
             logger.error(f"Error evaluating rule {rule_file}: {e}")
+        return None
     
-    def evaluate_node_for_rule(self, rule_object: Dict[str, Any], node_name: str) -> bool:
+    def apply_rule_result(self, rule_file: str, rule_object: Dict[str, Any], triggered_nodes: List[str]) -> None:
+        """对触发的节点执行规则动作并更新规则状态"""
+        rule_name = rule_object.get('metadata', {}).get('name')
+        try:
+            self.execute_rule_actions(rule_object, triggered_nodes)
+            self.update_rule_status(rule_name, "Active", "Rule triggered", triggered_nodes)
+        except Exception as e:
+            logger.error(f"Error executing actions for rule {rule_file}: {e}")
+    
+    def load_rule(self, rule_file: str) -> Tuple[Dict[str, Any], str]:
+        """读取规则文件，文件未修改时复用上次解析的结果"""
+        mtime_ns = os.stat(rule_file).st_mtime_ns
+        cached = self._rule_files.get(rule_file)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+        
+        with open(rule_file, 'rb') as f:
+            rule_data = f.read()
+        rule_object = loads(rule_data)
+        rule_json = rule_data.decode('utf-8')
+        
+        self._rule_files[rule_file] = (mtime_ns, rule_object, rule_json)
+        return rule_object, rule_json
+    
+    def evaluate_node_for_rule(self, rule_object: Dict[str, Any], node_name: str, cooldown_seconds: float, conditions: List[ParsedCondition]) -> bool:
         """评估节点是否满足规则条件"""
         rule_name = rule_object.get('metadata', {}).get('name')
         
         # 检查冷却期
-        cooldown_period = rule_object.get('spec', {}).get('monitoring', {}).get('cooldownPeriod', '5m')
-        if self.check_cooldown(rule_name, node_name, cooldown_period):
-            logger.debug(f"Rule {rule_name} for node {node_name} is in cooldown period")
+        if self.cooldowns.is_active(rule_name, node_name, cooldown_seconds):
+            if self._debug:
+                logger.debug("Rule %s for node %s is in cooldown period", rule_name, node_name)
+            return False
+        
+        # 非法节点名称无需调用kubectl
+        if not is_valid_node_name(node_name):
+            logger.warning(f"Invalid node name: {node_name!r}, skipping metrics")
             return False
         
-        # 获取条件
-        conditions = rule_object.get('spec', {}).get('conditions', [])
-        condition_logic = rule_object.get('spec', {}).get('conditionLogic', 'AND')
+        # AND遇到不满足的条件、OR遇到满足的条件即可得出结果，其余条件的指标不再获取
+        require_all = rule_object.get('spec', {}).get('conditionLogic', 'AND') == "AND"
         
-        satisfied_conditions = 0
+        # 多个条件引用同一指标时只获取一次
+        metric_values: Dict[str, Optional[float]] = {}
         
         # 评估每个条件
-        for condition in conditions:
-            metric = condition.get('metric')
-            operator = condition.get('operator')
-            threshold = condition.get('value')
-            duration = condition.get('duration', '5m')
-            
+        for metric, operator_name, compare, threshold in conditions:
             # 获取指标值
-            metric_value = self.get_metric_value(metric, node_name)
+            if metric not in metric_values:
+                metric_values[metric] = self.get_metric_value(metric, node_name)
+            metric_value = metric_values[metric]
+            
             if metric_value is None:
                 logger.error(f"Failed to get metric value for {metric} on node {node_name}")
-                continue
-            
-            # 评估条件
-            if self.evaluate_condition(metric_value, operator, threshold):
-                satisfied_conditions += 1
-                logger.debug(f"Condition satisfied for node {node_name}: {metric} {operator} {threshold} (value: {metric_value})")
+                satisfied = False
             else:
-                logger.debug(f"Condition not satisfied for node {node_name}: {metric} {operator} {threshold} (value: {metric_value})")
-        
-        # 根据逻辑判断是否触发
-        if condition_logic == "AND":
-            return satisfied_conditions == len(conditions)
-        else:  # OR
-            return satisfied_conditions > 0
-    
-    def get_matching_nodes(self, node_selector: Dict[str, Any]) -> List[str]:
-        """获取匹配节点选择器的节点"""
-        try:
-            # 构建kubectl命令
-            cmd = ["kubectl", "get", "nodes", "-o", "json"]
-            
-            # 如果有标签选择器，添加--selector参数
-            if node_selector:
-                selector_parts = []
-                for key, value in node_selector.items():
-                    selector_parts.append(f"{key}={value}")
-                if selector_parts:
-                    cmd.extend(["--selector", ",".join(selector_parts)])
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            nodes_data = json.loads(result.stdout)
-            
-            return [node['metadata']['name'] for node in nodes_data.get('items', [])]
+                satisfied = compare(metric_value, threshold)
+                if self._debug:
+                    logger.debug("Condition %s for node %s: %s %s %s (value: %s)",
+                                 "satisfied" if satisfied else "not satisfied", node_name, metric, operator_name, threshold, metric_value)
             
-        except Exception as e:
-            logger.error(f"Failed to get matching nodes: {e}")
-            return []
+            if satisfied != require_all:
+                return satisfied
+        
+        # AND时所有条件均满足，OR时没有条件满足
+        return require_all
     
     def get_metric_value(self, metric: str, node_name: str) -> Optional[float]:
         """获取指标值"""
+        getter = self._metric_getters.get(metric)
+        if getter is None:
+            logger.error(f"Unknown metric type: {metric}")
+            return None
+        
         try:
-            if metric == "cpuUtilizationPercent":
-                return self.get_node_cpu_utilization(node_name)
-            elif metric == "memoryUtilizationPercent":
-                return self.get_node_memory_utilization(node_name)
-            elif metric == "diskUtilizationPercent":
-                return self.get_node_disk_utilization(node_name)
-            elif metric == "cpuLoadRatio":
-                return self.get_node_cpu_load_ratio(node_name)
-            else:
-                logger.error(f"Unknown metric type: {metric}")
-                return None
+            return getter(node_name)
         except Exception as e:
             logger.error(f"Failed to get metric {metric} for node {node_name}: {e}")
             return None
@@ -354,21 +419,9 @@ class NodeGuardianController:
     def get_node_cpu_utilization(self, node_name: str) -> Optional[float]:
         """获取节点CPU使用率"""
         try:
-            # 使用kubectl top命令获取CPU使用率
-            cmd = ["kubectl", "top", "node", node_name, "--no-headers"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # 解析输出，格式通常是: "node-name 100m 1Gi"
-            parts = result.stdout.strip().split()
-            if len(parts) >= 2:
-                cpu_str = parts[1]
-                # 移除'm'后缀并转换为百分比
-                if cpu_str.endswith('m'):
-                    cpu_millicores = int(cpu_str[:-1])
-                    # 假设节点有2个CPU核心，每个1000m
-                    cpu_cores = 2
-                    return (cpu_millicores / (cpu_cores * 1000)) * 100
-            return None
+            # 使用kubectl top结果获取CPU使用率
+            usage = self.kube_client.get_node_usage(node_name)
+            return usage['cpuPercent'] if usage else None
         except Exception as e:
             logger.error(f"Failed to get CPU utilization for node {node_name}: {e}")
             return None
@@ -376,18 +429,9 @@ class NodeGuardianController:
     def get_node_memory_utilization(self, node_name: str) -> Optional[float]:
         """获取节点内存使用率"""
         try:
-            # 使用kubectl top命令获取内存使用率
-            cmd = ["kubectl", "top", "node", node_name, "--no-headers"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # 解析输出，格式通常是: "node-name 100m 1Gi"
-            parts = result.stdout.strip().split()
-            if len(parts) >= 3:
-                memory_str = parts[2]
-                # 这里需要获取节点的总内存来计算使用率
-                # 简化处理，返回一个模拟值
-                return 75.0  # 模拟75%内存使用率
-            return None
+            # 与CPU使用率共用同一次kubectl top结果
+            usage = self.kube_client.get_node_usage(node_name)
+            return usage['memoryPercent'] if usage else None
         except Exception as e:
             logger.error(f"Failed to get memory utilization for node {node_name}: {e}")
             return None
@@ -412,62 +456,6 @@ class NodeGuardianController:
             logger.error(f"Failed to get CPU load ratio for node {node_name}: {e}")
             return None
     
-    def evaluate_condition(self, metric_value: float, operator: str, threshold: float) -> bool:
-        """评估条件"""
-        try:
-            if operator == ">":
-                return metric_value > threshold
-            elif operator == ">=":
-                return metric_value >= threshold
-            elif operator == "<":
-                return metric_value < threshold
-            elif operator == "<=":
-                return metric_value <= threshold
-            elif operator == "==":
-                return abs(metric_value - threshold) < 0.001
-            elif operator == "!=":
-                return abs(metric_value - threshold) >= 0.001
-            else:
-                logger.error(f"Unknown operator: {operator}")
-                return False
-        except Exception as e:
-            logger.error(f"Error evaluating condition: {e}")
-            return False
-    
-    def check_cooldown(self, rule_name: str, node_name: str, cooldown_period: str) -> bool:
-        """检查冷却期"""
-        try:
-            cooldown_file = f"{self.cooldown_dir}/{rule_name}_{node_name}"
-            if not os.path.exists(cooldown_file):
-                return False
-            
-            # 检查文件修改时间
-            import time
-            file_mtime = os.path.getmtime(cooldown_file)
-            current_time = time.time()
-            
-            # 解析冷却期（简化处理，假设格式为"5m"）
-            if cooldown_period.endswith('m'):
-                cooldown_seconds = int(cooldown_period[:-1]) * 60
-            elif cooldown_period.endswith('s'):
-                cooldown_seconds = int(cooldown_period[:-1])
-            else:
-                cooldown_seconds = 300  # 默认5分钟
-            
-            return (current_time - file_mtime) < cooldown_seconds
-            
-        except Exception as e:
-            logger.error(f"Error checking cooldown: {e}")
-            return False
-    
-    def set_cooldown(self, rule_name: str, node_name: str) -> None:
-        """设置冷却期"""
-        try:
-            cooldown_file = f"{self.cooldown_dir}/{rule_name}_{node_name}"
-            Path(cooldown_file).touch()
-        except Exception as e:
-            logger.error(f"Error setting cooldown: {e}")
-    
     def execute_rule_actions(self, rule_object: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行规则动作"""
         rule_name = rule_object.get('metadata', {}).get('name')
@@ -492,9 +480,8 @@ class NodeGuardianController:
                 logger.warning(f"Unknown action type: {action_type}")
         
         # 设置冷却期
-        cooldown_period = rule_object.get('spec', {}).get('monitoring', {}).get('cooldownPeriod', '5m')
         for node_name in triggered_nodes:
-            self.set_cooldown(rule_name, node_name)
+            self.cooldowns.start(rule_name, node_name)
     
     def execute_taint_action(self, action: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行污点动作"""
@@ -502,13 +489,12 @@ class NodeGuardianController:
         taint_value = action.get('taint', {}).get('value', 'true')
         taint_effect = action.get('taint', {}).get('effect', 'NoSchedule')
         
-        for node_name in triggered_nodes:
-            logger.info(f"Adding taint to node {node_name}: {taint_key}={taint_value}:{taint_effect}")
-            try:
-                cmd = ["kubectl", "taint", "nodes", node_name, f"{taint_key}={taint_value}:{taint_effect}", "--overwrite"]
-                subprocess.run(cmd, check=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to add taint to node {node_name}: {e}")
+        logger.info(f"Adding taint to nodes {triggered_nodes}: {taint_key}={taint_value}:{taint_effect}")
+        try:
+            # 所有触发节点通过一次kubectl调用添加污点
+            self.kube_client.taint_nodes(triggered_nodes, taint_key, taint_value, taint_effect)
+        except (subprocess.CalledProcessError, TransientKubeError) as e:
+            logger.error(f"Failed to add taint to nodes {triggered_nodes}: {e}")
     
     def execute_alert_action(self, action: Dict[str, Any], rule_object: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行告警动作"""
@@ -519,13 +505,32 @@ class NodeGuardianController:
         template_name = action.get('alert', {}).get('template', 'default')
         channels = action.get('alert', {}).get('channels', [])
         
-        # 调用告警管理器
+        # 后台调用告警管理器，不阻塞后续动作和规则的执行
         try:
-            cmd = ["python3", "/scripts/alert_manager.py", template_name, json.dumps(rule_object), json.dumps(triggered_nodes), json.dumps(channels)]
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
+            cmd = ["python3", "/scripts/alert_manager.py", template_name, self.serialize_rule(rule_object), json.dumps(triggered_nodes), json.dumps(channels)]
+            self._alert_processes.append(subprocess.Popen(cmd))
+        except OSError as e:
             logger.error(f"Failed to send alert: {e}")
     
+    def wait_for_alerts(self) -> None:
+        """等待后台告警进程结束"""
+        for process in self._alert_processes:
+            returncode = process.wait()
+            if returncode != 0:
+                logger.error(f"Failed to send alert: alert manager exited with status {returncode}")
+        self._alert_processes.clear()
+    
+    def serialize_rule(self, rule_object: Dict[str, Any]) -> str:
+        """获取规则的JSON文本，同一规则对象只序列化一次"""
+        rule_name = rule_object.get('metadata', {}).get('name')
+        cached = self._serialized_rules.get(rule_name)
+        if cached is not None and cached[0] is rule_object:
+            return cached[1]
+        
+        rule_json = json.dumps(rule_object)
+        self._serialized_rules[rule_name] = (rule_object, rule_json)
+        return rule_json
+    
     def execute_evict_action(self, action: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行驱逐动作"""
         max_pods = action.get('evict', {}).get('maxPods', 10)
@@ -535,24 +540,20 @@ class NodeGuardianController:
             logger.info(f"Evicting pods from node {node_name} (max: {max_pods})")
             
             try:
-                # 获取节点上的Pod
-                cmd = ["kubectl", "get", "pods", "--all-namespaces", "-o", "json", "--field-selector", f"spec.nodeName={node_name}"]
+                # 在API Server端排除命名空间和已结束的Pod，只返回命名空间和名称
+                field_selector = ",".join(
+                    [f"spec.nodeName={node_name}", "status.phase!=Succeeded", "status.phase!=Failed"]
+                    + [f"metadata.namespace!={namespace}" for namespace in exclude_namespaces]
+                )
+                cmd = ["kubectl", "get", "pods", "--all-namespaces", "--field-selector", field_selector,
+                       "-o", "jsonpath={range .items[*]}{.metadata.namespace}{\" \"}{.metadata.name}{\"\\n\"}{end}"]
                 result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                pods_data = json.loads(result.stdout)
                 
-                evicted_count = 0
-                for pod in pods_data.get('items', []):
-                    if evicted_count >= max_pods:
-                        break
-                    
-                    namespace = pod['metadata']['namespace']
-                    pod_name = pod['metadata']['name']
-                    
-                    if namespace not in exclude_namespaces:
-                        logger.info(f"Evicting pod: {namespace}/{pod_name}")
-                        cmd = ["kubectl", "delete", "pod", f"{namespace}/{pod_name}", "--grace-period=30"]
-                        subprocess.run(cmd, check=True)
-                        evicted_count += 1
+                for line in result.stdout.splitlines()[:max_pods]:
+                    namespace, pod_name = line.split()
+                    logger.info(f"Evicting pod: {namespace}/{pod_name}")
+                    cmd = ["kubectl", "delete", "pod", pod_name, "-n", namespace, "--grace-period=30"]
+                    subprocess.run(cmd, check=True)
                         
             except subprocess.CalledProcessError as e:
                 logger.error(f"Failed to evict pods from node {node_name}: {e}")
@@ -560,40 +561,28 @@ class NodeGuardianController:
     def execute_label_action(self, action: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行标签动作"""
         labels = action.get('label', {}).get('labels', {})
+        if not labels:
+            return
         
-        for node_name in triggered_nodes:
-            logger.info(f"Adding labels to node {node_name}: {labels}")
-            
-            try:
-                label_args = []
-                for key, value in labels.items():
-                    label_args.extend([f"{key}={value}"])
-                
-                if label_args:
-                    cmd = ["kubectl", "label", "nodes", node_name] + label_args + ["--overwrite"]
-                    subprocess.run(cmd, check=True)
-                    
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to add labels to node {node_name}: {e}")
+        logger.info(f"Adding labels to nodes {triggered_nodes}: {labels}")
+        try:
+            # 所有触发节点通过一次kubectl调用添加标签
+            self.kube_client.label_nodes(triggered_nodes, labels)
+        except (subprocess.CalledProcessError, TransientKubeError) as e:
+            logger.error(f"Failed to add labels to nodes {triggered_nodes}: {e}")
     
     def execute_annotation_action(self, action: Dict[str, Any], triggered_nodes: List[str]) -> None:
         """执行注解动作"""
         annotations = action.get('annotation', {}).get('annotations', {})
+        if not annotations:
+            return
         
-        for node_name in triggered_nodes:
-            logger.info(f"Adding annotations to node {node_name}: {annotations}")
-            
-            try:
-                annotation_args = []
-                for key, value in annotations.items():
-                    annotation_args.extend([f"{key}={value}"])
-                
-                if annotation_args:
-                    cmd = ["kubectl", "annotate", "nodes", node_name] + annotation_args + ["--overwrite"]
-                    subprocess.run(cmd, check=True)
-                    
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to add annotations to node {node_name}: {e}")
+        logger.info(f"Adding annotations to nodes {triggered_nodes}: {annotations}")
+        try:
+            # 所有触发节点通过一次kubectl调用添加注解
+            self.kube_client.annotate_nodes(triggered_nodes, annotations)
+        except (subprocess.CalledProcessError, TransientKubeError) as e:
+            logger.error(f"Failed to add annotations to nodes {triggered_nodes}: {e}")
     
     def update_rule_status(self, rule_name: str, status: str, message: str, triggered_nodes: List[str]) -> None:
         """更新规则状态"""
@@ -615,7 +604,7 @@ class NodeGuardianController:
     
     def create_namespace_if_not_exists(self) -> None:
         """创建命名空间"""
-        namespace = "nodeguardian-system"
+        namespace = NODEGUARDIAN_NAMESPACE
         try:
             cmd = ["kubectl", "get", "namespace", namespace]
             subprocess.run(cmd, check=True, capture_output=True)
@@ -626,7 +615,7 @@ class NodeGuardianController:
     
     def create_configmap_if_not_exists(self) -> None:
         """创建配置映射"""
-        namespace = "nodeguardian-system"
+        namespace = NODEGUARDIAN_NAMESPACE
         try:
             cmd = ["kubectl", "get", "configmap", "nodeguardian-config", "-n", namespace]
             subprocess.run(cmd, check=True, capture_output=True)
@@ -642,9 +631,8 @@ class NodeGuardianController:
         pass
     
     def get_current_timestamp(self) -> str:
-        """获取当前时间戳"""
-        from datetime import datetime
-        return datetime.utcnow().isoformat() + "Z"
+        """获取当前UTC时间戳"""
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
 
 def main():
     """主函数"""
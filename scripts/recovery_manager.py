@@ -9,23 +9,25 @@ import os
 import sys
 import logging
 import subprocess
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional
 from pathlib import Path
 
-# 导入配置加载器
-from config_loader import get_config, get_config_section, get_config_value
+# 导入配置加载器和日志初始化
+from config_loader import get_config, get_config_section, parse_duration
+from log_setup import setup_logging
+from kube_client import KubernetesClient, TransientKubeError, get_kube_client, is_valid_node_name
+from rule_common import CooldownStore, ParsedCondition, get_matching_nodes, parse_conditions
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging(get_config_section('log'))
 logger = logging.getLogger(__name__)
 
 class RecoveryManager:
     """NodeGuardian恢复管理器"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, kube_client: Optional[KubernetesClient] = None):
         self.config_dir = "/etc/nodeguardian/config"
         self.secrets_dir = "/etc/nodeguardian/secrets"
         self.config_file = f"{self.config_dir}/config.json"
@@ -34,10 +36,35 @@ class RecoveryManager:
         
         # 确保目录存在
         Path(self.rules_dir).mkdir(parents=True, exist_ok=True)
-        Path(self.cooldown_dir).mkdir(parents=True, exist_ok=True)
         
-        # 加载配置
-        self.config = get_config()
+        # 加载配置，调用方可传入已加载的配置
+        self.config = config if config is not None else get_config()
+        
+        # 并发检查节点的最大线程数，构造时解析一次
+        self.max_concurrent_checks = max(1, int(self.config.get('monitoring', {}).get('maxConcurrentChecks', 10)))
+        
+        # 一个恢复告警最多合并的节点数，构造时解析一次
+        self.alert_batch_size = max(1, int(self.config.get('alert', {}).get('batchSize', 10)))
+        
+        # 构造时确定是否输出调试日志，热路径上关闭调试时不构造日志参数
+        self._debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # 与控制器共享的Kubernetes客户端
+        self.kube_client = kube_client or get_kube_client()
+        
+        # 指标名称到获取函数的映射，构造时绑定一次
+        self._metric_getters: Dict[str, Callable[[str], Optional[float]]] = {
+            "cpuUtilizationPercent": self.get_node_cpu_utilization,
+            "memoryUtilizationPercent": self.get_node_memory_utilization,
+            "diskUtilizationPercent": self.get_node_disk_utilization,
+            "cpuLoadRatio": self.get_node_cpu_load_ratio
+        }
+        
+        # 后台运行的告警进程，在本次处理结束前统一回收
+        self._alert_processes: List[subprocess.Popen] = []
+        
+        # 冷却期记录，首次检查时扫描一次冷却期目录
+        self.cooldowns = CooldownStore(self.cooldown_dir)
     
     def run(self, args: List[str]) -> None:
         """主运行函数"""
@@ -70,6 +97,8 @@ class RecoveryManager:
         except Exception as e:
             logger.error(f"Error in main run: {e}")
             sys.exit(1)
+        finally:
+            self.wait_for_alerts()
     
     def check_recovery_conditions(self) -> None:
         """检查恢复条件"""
@@ -78,13 +107,21 @@ class RecoveryManager:
         if not os.path.exists(self.rules_dir):
             return
         
-        for rule_file in Path(self.rules_dir).glob("*.json"):
-            if rule_file.is_file():
-                rule_name = rule_file.stem
-                self.check_rule_recovery(str(rule_file))
+        # 本轮检查中各规则共用的节点选择器匹配结果
+        selector_cache: Dict[str, List[str]] = {}
+        
+        # 规则按顺序检查，只在节点一级并发，所有规则共用同一个线程池
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_checks) as executor:
+            try:
+                for rule_file in Path(self.rules_dir).glob("*.json"):
+                    if rule_file.is_file():
+                        self.check_rule_recovery(str(rule_file), selector_cache, executor)
+            except TransientKubeError as e:
+                # API Server不可用时其余规则同样会失败，放弃本轮检查等待下次调度
+                logger.warning(f"Kubernetes API temporarily unavailable, skipping remaining rules: {e}")
     
-    def check_rule_recovery(self, rule_file: str) -> None:
-        """检查单个规则的恢复条件"""
+    def check_rule_recovery(self, rule_file: str, selector_cache: Optional[Dict[str, List[str]]] = None, executor: Optional[ThreadPoolExecutor] = None) -> None:
+        """检查单个规则的恢复条件，传入executor时各节点在其中并发检查"""
         try:
             with open(rule_file, 'r') as f:
                 rule_object = json.load(f)
@@ -100,24 +137,44 @@ class RecoveryManager:
             if not recovery_conditions:
                 return
             
-            logger.debug(f"Checking recovery conditions for rule: {rule_name}")
+            if self._debug:
+                logger.debug("Checking recovery conditions for rule: %s", rule_name)
             
             # 获取节点选择器
             node_selector = rule_object.get('spec', {}).get('nodeSelector', {})
-            matching_nodes = self.get_matching_nodes(node_selector)
+            matching_nodes = get_matching_nodes(self.kube_client, node_selector, selector_cache)
             
             if not matching_nodes:
                 return
             
-            # 检查每个节点的恢复条件
-            for node_name in matching_nodes:
-                if self.check_node_recovery(rule_object, node_name):
-                    self.execute_recovery_actions(rule_object, node_name)
+            # 一次性获取所有节点的资源使用，避免逐节点调用kubectl top
+            self.kube_client.refresh_node_usage()
+            
+            # 恢复冷却期每个规则只解析一次，所有节点共用
+            recovery_cooldown = rule_object.get('spec', {}).get('monitoring', {}).get('recoveryCooldownPeriod', '2m')
+            cooldown_seconds = parse_duration(recovery_cooldown, 120)  # 默认2分钟
+            
+            # 恢复条件每个规则只解析一次，所有节点共用
+            conditions = parse_conditions(recovery_conditions)
+            
+            # 各节点的恢复条件检查相互独立，在调用方的线程池中并发执行
+            check_node = lambda node_name: self.check_node_recovery(rule_object, node_name, cooldown_seconds, conditions)
+            results = list(executor.map(check_node, matching_nodes) if executor is not None else map(check_node, matching_nodes))
+            
+            # 按节点顺序执行恢复动作
+            recovered_nodes = [node_name for node_name, recovered in zip(matching_nodes, results) if recovered]
+            for node_name in recovered_nodes:
+                self.execute_recovery_actions(rule_object, node_name)
+            
+            # 本轮同一规则恢复的节点合并发送告警，而不是每个节点各发一次
+            self.send_recovery_alerts(rule_object, recovered_nodes)
                     
+        except TransientKubeError:
+            raise
         except Exception as e:
             logger.error(f"Error checking rule recovery {rule_file}: {e}")
     
-    def check_node_recovery(self, rule_object: Dict[str, Any], node_name: str) -> bool:
+    def check_node_recovery(self, rule_object: Dict[str, Any], node_name: str, cooldown_seconds: float, conditions: List[ParsedCondition]) -> bool:
         """检查节点的恢复条件"""
         rule_name = rule_object.get('metadata', {}).get('name')
         
@@ -126,69 +183,65 @@ class RecoveryManager:
             return False
         
         # 检查恢复冷却期
-        recovery_cooldown = rule_object.get('spec', {}).get('monitoring', {}).get('recoveryCooldownPeriod', '2m')
-        if self.check_cooldown(f"{rule_name}_recovery", node_name, recovery_cooldown):
-            logger.debug(f"Node {node_name} is in recovery cooldown period for rule {rule_name}")
+        if self.cooldowns.is_active(f"{rule_name}_recovery", node_name, cooldown_seconds):
+            if self._debug:
+                logger.debug("Node %s is in recovery cooldown period for rule %s", node_name, rule_name)
+            return False
+        
+        # 非法节点名称无需调用kubectl
+        if not is_valid_node_name(node_name):
+            logger.warning(f"Invalid node name: {node_name!r}, skipping metrics")
             return False
         
-        # 获取恢复条件
-        recovery_conditions = rule_object.get('spec', {}).get('recoveryConditions', [])
-        condition_logic = rule_object.get('spec', {}).get('recoveryConditionLogic', 'AND')
+        # AND遇到不满足的条件、OR遇到满足的条件即可得出结果，其余条件的指标不再获取
+        require_all = rule_object.get('spec', {}).get('recoveryConditionLogic', 'AND') == "AND"
         
-        satisfied_conditions = 0
+        # 多个条件引用同一指标时只获取一次
+        metric_values: Dict[str, Optional[float]] = {}
         
         # 评估每个恢复条件
-        for condition in recovery_conditions:
-            metric = condition.get('metric')
-            operator = condition.get('operator')
-            threshold = condition.get('value')
-            duration = condition.get('duration', '5m')
-            
+        for metric, operator_name, compare, threshold in conditions:
             # 获取指标值
-            metric_value = self.get_metric_value(metric, node_name)
+            if metric not in metric_values:
+                metric_values[metric] = self.get_metric_value(metric, node_name)
+            metric_value = metric_values[metric]
+            
             if metric_value is None:
                 logger.error(f"Failed to get metric value for {metric} on node {node_name}")
-                continue
-            
-            # 评估恢复条件
-            if self.evaluate_condition(metric_value, operator, threshold):
-                satisfied_conditions += 1
-                logger.debug(f"Recovery condition satisfied for node {node_name}: {metric} {operator} {threshold} (value: {metric_value})")
+                satisfied = False
             else:
-                logger.debug(f"Recovery condition not satisfied for node {node_name}: {metric} {operator} {threshold} (value: {metric_value})")
+                satisfied = compare(metric_value, threshold)
+                if self._debug:
+                    logger.debug("Recovery condition %s for node %s: %s %s %s (value: %s)",
+                                 "satisfied" if satisfied else "not satisfied", node_name, metric, operator_name, threshold, metric_value)
+            
+            if satisfied != require_all:
+                return satisfied
         
-        # 根据逻辑判断是否满足恢复条件
-        if condition_logic == "AND":
-            return satisfied_conditions == len(recovery_conditions)
-        else:  # OR
-            return satisfied_conditions > 0
+        # AND时所有恢复条件均满足，OR时没有恢复条件满足
+        return require_all
     
     def is_node_triggered(self, rule_name: str, node_name: str) -> bool:
         """检查节点是否在触发状态"""
         try:
-            # 检查是否有污点
-            taint_key = "nodeguardian/rule-triggered"
-            cmd = ["kubectl", "describe", "node", node_name]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            node = self.kube_client.get_node(node_name)
             
-            if taint_key in result.stdout:
+            # 检查是否有污点，按污点键精确匹配
+            taint_key = "nodeguardian/rule-triggered"
+            taints = node.get('spec', {}).get('taints') or []
+            if any(taint.get('key') == taint_key for taint in taints):
                 return True
             
             # 检查是否有相关标签
-            cmd = ["kubectl", "get", "node", node_name, "-o", "jsonpath={.metadata.labels}"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            if "nodeguardian.io/rule-triggered" in result.stdout:
-                return True
+            labels = node.get('metadata', {}).get('labels') or {}
+            return "nodeguardian.io/rule-triggered" in labels
             
-            return False
-            
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
             logger.error(f"Failed to check if node {node_name} is triggered: {e}")
             return False
     
     def execute_recovery_actions(self, rule_object: Dict[str, Any], node_name: str) -> None:
-        """执行恢复动作"""
+        """执行恢复动作，告警动作由send_recovery_alerts按规则合并发送"""
         rule_name = rule_object.get('metadata', {}).get('name')
         
         logger.info(f"Executing recovery actions for rule: {rule_name} on node: {node_name}")
@@ -200,6 +253,9 @@ class RecoveryManager:
             logger.info(f"No recovery actions defined for rule: {rule_name}")
             return
         
+        # 本次恢复的所有动作共用同一时间戳
+        timestamp = self.get_current_timestamp()
+        
         # 执行每个恢复动作
         for action in recovery_actions:
             action_type = action.get('type')
@@ -211,59 +267,72 @@ class RecoveryManager:
             elif action_type == "removeAnnotation":
                 self.execute_remove_annotation_action(action, node_name)
             elif action_type == "alert":
-                self.execute_recovery_alert_action(action, rule_object, node_name)
+                continue
             else:
                 logger.warning(f"Unknown recovery action type: {action_type}")
         
         # 设置恢复冷却期
-        recovery_cooldown = rule_object.get('spec', {}).get('monitoring', {}).get('recoveryCooldownPeriod', '2m')
-        self.set_cooldown(f"{rule_name}_recovery", node_name)
+        self.cooldowns.start(f"{rule_name}_recovery", node_name)
         
         # 更新规则状态
-        self.update_rule_recovery_status(rule_name, node_name)
+        self.update_rule_recovery_status(rule_name, node_name, timestamp)
         
         logger.info(f"Recovery actions completed for rule: {rule_name} on node: {node_name}")
     
     def execute_untaint_action(self, action: Dict[str, Any], node_name: str) -> None:
         """执行去污点动作"""
         taint_key = action.get('untaint', {}).get('key', 'nodeguardian/rule-triggered')
-        taint_value = action.get('untaint', {}).get('value', 'true')
         taint_effect = action.get('untaint', {}).get('effect', 'NoSchedule')
         
-        logger.info(f"Removing taint from node {node_name}: {taint_key}={taint_value}:{taint_effect}")
+        logger.info(f"Removing taint from node {node_name}: {taint_key}:{taint_effect}")
         
         try:
-            cmd = ["kubectl", "taint", "nodes", node_name, f"{taint_key}={taint_value}:{taint_effect}", "--overwrite"]
-            subprocess.run(cmd, check=True)
+            self.kube_client.remove_node_taint(node_name, taint_key, taint_effect)
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to remove taint from node {node_name}: {e}")
     
     def execute_remove_label_action(self, action: Dict[str, Any], node_name: str) -> None:
         """执行移除标签动作"""
         labels = action.get('removeLabel', {}).get('labels', [])
+        if not labels:
+            return
         
-        for label in labels:
-            logger.info(f"Removing label from node {node_name}: {label}")
-            try:
-                cmd = ["kubectl", "label", "nodes", node_name, f"{label}-"]
-                subprocess.run(cmd, check=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to remove label {label} from node {node_name}: {e}")
+        logger.info(f"Removing labels from node {node_name}: {labels}")
+        try:
+            # 一次merge patch删除所有标签
+            self.kube_client.merge_patch_node(node_name, {"metadata": {"labels": {label: None for label in labels}}})
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to remove labels {labels} from node {node_name}: {e}")
     
     def execute_remove_annotation_action(self, action: Dict[str, Any], node_name: str) -> None:
         """执行移除注解动作"""
         annotations = action.get('removeAnnotation', {}).get('annotations', [])
+        if not annotations:
+            return
         
-        for annotation in annotations:
-            logger.info(f"Removing annotation from node {node_name}: {annotation}")
-            try:
-                cmd = ["kubectl", "annotate", "nodes", node_name, f"{annotation}-"]
-                subprocess.run(cmd, check=True)
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Failed to remove annotation {annotation} from node {node_name}: {e}")
+        logger.info(f"Removing annotations from node {node_name}: {annotations}")
+        try:
+            # 一次merge patch删除所有注解
+            self.kube_client.merge_patch_node(node_name, {"metadata": {"annotations": {annotation: None for annotation in annotations}}})
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Failed to remove annotations {annotations} from node {node_name}: {e}")
     
-    def execute_recovery_alert_action(self, action: Dict[str, Any], rule_object: Dict[str, Any], node_name: str) -> None:
-        """执行恢复告警动作"""
+    def send_recovery_alerts(self, rule_object: Dict[str, Any], node_names: List[str]) -> None:
+        """为本轮恢复的节点发送恢复告警，每个告警动作按批次大小合并多个节点"""
+        if not node_names:
+            return
+        
+        alert_actions = [action for action in rule_object.get('spec', {}).get('recoveryActions', []) if action.get('type') == "alert"]
+        if not alert_actions:
+            return
+        
+        timestamp = self.get_current_timestamp()
+        for action in alert_actions:
+            for start in range(0, len(node_names), self.alert_batch_size):
+                self.execute_recovery_alert_action(action, rule_object, node_names[start:start + self.alert_batch_size], timestamp)
+    
+    def execute_recovery_alert_action(self, action: Dict[str, Any], rule_object: Dict[str, Any], node_names: List[str], timestamp: Optional[str] = None) -> None:
+        """执行恢复告警动作，一次告警包含多个恢复的节点"""
         alert_enabled = action.get('alert', {}).get('enabled', True)
         if not alert_enabled:
             return
@@ -272,30 +341,40 @@ class RecoveryManager:
         channels = action.get('alert', {}).get('channels', [])
         
         # 为规则对象添加恢复告警信息
+        nodes_text = ', '.join(node_names)
         recovery_rule_object = rule_object.copy()
         recovery_rule_object.update({
             "type": "recovery",
             "recoveryInfo": {
-                "nodeName": node_name,
-                "timestamp": self.get_current_timestamp(),
-                "message": f"Node {node_name} has recovered from rule {rule_object.get('metadata', {}).get('name')}"
+                "nodeName": nodes_text,
+                "nodeNames": node_names,
+                "timestamp": timestamp or self.get_current_timestamp(),
+                "message": f"Node {nodes_text} has recovered from rule {rule_object.get('metadata', {}).get('name')}"
             }
         })
         
-        # 调用告警管理器
+        # 后台调用告警管理器，不阻塞后续规则的恢复处理
         try:
             cmd = [
                 "python3", "/scripts/alert_manager.py",
                 template_name,
                 json.dumps(recovery_rule_object),
-                json.dumps([node_name]),
+                json.dumps(node_names),
                 json.dumps(channels)
             ]
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
+            self._alert_processes.append(subprocess.Popen(cmd))
+        except OSError as e:
             logger.error(f"Failed to send recovery alert: {e}")
     
-    def update_rule_recovery_status(self, rule_name: str, node_name: str) -> None:
+    def wait_for_alerts(self) -> None:
+        """等待后台告警进程结束"""
+        for process in self._alert_processes:
+            returncode = process.wait()
+            if returncode != 0:
+                logger.error(f"Failed to send recovery alert: alert manager exited with status {returncode}")
+        self._alert_processes.clear()
+    
+    def update_rule_recovery_status(self, rule_name: str, node_name: str, timestamp: Optional[str] = None) -> None:
         """更新规则恢复状态"""
         try:
             # 获取当前状态
@@ -311,7 +390,7 @@ class RecoveryManager:
             status_patch = {
                 "status": {
                     "triggeredNodes": updated_nodes,
-                    "lastRecovery": self.get_current_timestamp()
+                    "lastRecovery": timestamp or self.get_current_timestamp()
                 }
             }
             
@@ -321,43 +400,15 @@ class RecoveryManager:
         except subprocess.CalledProcessError as e:
             logger.error(f"Failed to update rule recovery status for {rule_name}: {e}")
     
-    def get_matching_nodes(self, node_selector: Dict[str, Any]) -> List[str]:
-        """获取匹配节点选择器的节点"""
-        try:
-            # 构建kubectl命令
-            cmd = ["kubectl", "get", "nodes", "-o", "json"]
-            
-            # 如果有标签选择器，添加--selector参数
-            if node_selector:
-                selector_parts = []
-                for key, value in node_selector.items():
-                    selector_parts.append(f"{key}={value}")
-                if selector_parts:
-                    cmd.extend(["--selector", ",".join(selector_parts)])
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            nodes_data = json.loads(result.stdout)
-            
-            return [node['metadata']['name'] for node in nodes_data.get('items', [])]
-            
-        except Exception as e:
-            logger.error(f"Failed to get matching nodes: {e}")
-            return []
-    
     def get_metric_value(self, metric: str, node_name: str) -> Optional[float]:
         """获取指标值"""
+        getter = self._metric_getters.get(metric)
+        if getter is None:
+            logger.error(f"Unknown metric type: {metric}")
+            return None
+        
         try:
-            if metric == "cpuUtilizationPercent":
-                return self.get_node_cpu_utilization(node_name)
-            elif metric == "memoryUtilizationPercent":
-                return self.get_node_memory_utilization(node_name)
-            elif metric == "diskUtilizationPercent":
-                return self.get_node_disk_utilization(node_name)
-            elif metric == "cpuLoadRatio":
-                return self.get_node_cpu_load_ratio(node_name)
-            else:
-                logger.error(f"Unknown metric type: {metric}")
-                return None
+            return getter(node_name)
         except Exception as e:
             logger.error(f"Failed to get metric {metric} for node {node_name}: {e}")
             return None
@@ -365,21 +416,9 @@ class RecoveryManager:
     def get_node_cpu_utilization(self, node_name: str) -> Optional[float]:
         """获取节点CPU使用率"""
         try:
-            # 使用kubectl top命令获取CPU使用率
-            cmd = ["kubectl", "top", "node", node_name, "--no-headers"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # 解析输出，格式通常是: "node-name 100m 1Gi"
-            parts = result.stdout.strip().split()
-            if len(parts) >= 2:
-                cpu_str = parts[1]
-                # 移除'm'后缀并转换为百分比
-                if cpu_str.endswith('m'):
-                    cpu_millicores = int(cpu_str[:-1])
-                    # 假设节点有2个CPU核心，每个1000m
-                    cpu_cores = 2
-                    return (cpu_millicores / (cpu_cores * 1000)) * 100
-            return None
+            # 使用kubectl top结果获取CPU使用率
+            usage = self.kube_client.get_node_usage(node_name)
+            return usage['cpuPercent'] if usage else None
         except Exception as e:
             logger.error(f"Failed to get CPU utilization for node {node_name}: {e}")
             return None
@@ -387,18 +426,9 @@ class RecoveryManager:
     def get_node_memory_utilization(self, node_name: str) -> Optional[float]:
         """获取节点内存使用率"""
         try:
-            # 使用kubectl top命令获取内存使用率
-            cmd = ["kubectl", "top", "node", node_name, "--no-headers"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # 解析输出，格式通常是: "node-name 100m 1Gi"
-            parts = result.stdout.strip().split()
-            if len(parts) >= 3:
-                memory_str = parts[2]
-                # 这里需要获取节点的总内存来计算使用率
-                # 简化处理，返回一个模拟值
-                return 45.0  # 模拟45%内存使用率（恢复状态）
-            return None
+            # 与CPU使用率共用同一次kubectl top结果
+            usage = self.kube_client.get_node_usage(node_name)
+            return usage['memoryPercent'] if usage else None
         except Exception as e:
             logger.error(f"Failed to get memory utilization for node {node_name}: {e}")
             return None
@@ -423,66 +453,9 @@ class RecoveryManager:
             logger.error(f"Failed to get CPU load ratio for node {node_name}: {e}")
             return None
     
-    def evaluate_condition(self, metric_value: float, operator: str, threshold: float) -> bool:
-        """评估条件"""
-        try:
-            if operator == ">":
-                return metric_value > threshold
-            elif operator == ">=":
-                return metric_value >= threshold
-            elif operator == "<":
-                return metric_value < threshold
-            elif operator == "<=":
-                return metric_value <= threshold
-            elif operator == "==":
-                return abs(metric_value - threshold) < 0.001
-            elif operator == "!=":
-                return abs(metric_value - threshold) >= 0.001
-            else:
-                logger.error(f"Unknown operator: {operator}")
-                return False
-        except Exception as e:
-            logger.error(f"Error evaluating condition: {e}")
-            return False
-    
-    def check_cooldown(self, rule_name: str, node_name: str, cooldown_period: str) -> bool:
-        """检查冷却期"""
-        try:
-            cooldown_file = f"{self.cooldown_dir}/{rule_name}_{node_name}"
-            if not os.path.exists(cooldown_file):
-                return False
-            
-            # 检查文件修改时间
-            import time
-            file_mtime = os.path.getmtime(cooldown_file)
-            current_time = time.time()
-            
-            # 解析冷却期（简化处理，假设格式为"2m"）
-            if cooldown_period.endswith('m'):
-                cooldown_seconds = int(cooldown_period[:-1]) * 60
-            elif cooldown_period.endswith('s'):
-                cooldown_seconds = int(cooldown_period[:-1])
-            else:
-                cooldown_seconds = 120  # 默认2分钟
-            
-            return (current_time - file_mtime) < cooldown_seconds
-            
-        except Exception as e:
-            logger.error(f"Error checking cooldown: {e}")
-            return False
-    
-    def set_cooldown(self, rule_name: str, node_name: str) -> None:
-        """设置冷却期"""
-        try:
-            cooldown_file = f"{self.cooldown_dir}/{rule_name}_{node_name}"
-            Path(cooldown_file).touch()
-        except Exception as e:
-            logger.error(f"Error setting cooldown: {e}")
-    
     def get_current_timestamp(self) -> str:
-        """获取当前时间戳"""
-        from datetime import datetime
-        return datetime.utcnow().isoformat() + "Z"
+        """获取当前UTC时间戳"""
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
 
 def main():
     """主函数"""
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+NodeGuardian规则公共逻辑
+控制器和恢复管理器共用的条件解析、节点匹配和冷却期管理
+"""
+
+import json
+import logging
+import operator
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from pathlib import Path
+
+from kube_client import KubernetesClient, TransientKubeError
+
+logger = logging.getLogger(__name__)
+
+def _float_equal(metric_value: float, threshold: float) -> bool:
+    return abs(metric_value - threshold) < 0.001
+
+def _float_not_equal(metric_value: float, threshold: float) -> bool:
+    return abs(metric_value - threshold) >= 0.001
+
+# 条件操作符对应的比较函数，同时支持CRD中定义的操作符名称和符号形式
+CONDITION_OPERATORS: Dict[str, Callable[[float, float], bool]] = {
+    "GreaterThan": operator.gt,
+    "GreaterThanOrEqual": operator.ge,
+    "LessThan": operator.lt,
+    "LessThanOrEqual": operator.le,
+    "EqualTo": _float_equal,
+    "NotEqualTo": _float_not_equal,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": _float_equal,
+    "!=": _float_not_equal
+}
+
+class ParsedCondition(NamedTuple):
+    """解析后的条件，基于元组实现，没有实例字典"""
+    metric: str
+    operator: str
+    compare: Callable[[float, float], bool]
+    threshold: float
+
+def parse_conditions(conditions: List[Dict[str, Any]]) -> List[ParsedCondition]:
+    """将规则条件解析为ParsedCondition列表，操作符或阈值无效时抛出异常"""
+    parsed = []
+    for condition in conditions:
+        operator_name = condition.get('operator')
+        compare = CONDITION_OPERATORS.get(operator_name)
+        if compare is None:
+            raise ValueError(f"Unknown operator: {operator_name}")
+        # 驻留指标和操作符字符串，查找指标获取函数时可直接按对象比较
+        metric = condition.get('metric')
+        if isinstance(metric, str):
+            metric = sys.intern(metric)
+        parsed.append(ParsedCondition(metric, sys.intern(operator_name), compare, float(condition.get('value'))))
+    return parsed
+
+def get_matching_nodes(kube_client: KubernetesClient, node_selector: Dict[str, Any], selector_cache: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """获取匹配节点选择器的节点，传入selector_cache时相同的选择器只匹配一次"""
+    try:
+        # 直接指定节点名称的选择器无需匹配，不必计算缓存键
+        if selector_cache is None or (node_selector or {}).get('nodeNames'):
+            return kube_client.get_node_names(node_selector)
+        
+        # 按键排序序列化得到选择器的规范形式，作为本轮匹配结果的缓存键
+        key = json.dumps(node_selector, sort_keys=True)
+        matching_nodes = selector_cache.get(key)
+        if matching_nodes is None:
+            matching_nodes = selector_cache[key] = kube_client.get_node_names(node_selector)
+        return matching_nodes
+    except TransientKubeError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get matching nodes: {e}")
+        return []
+
+class CooldownStore:
+    """冷却期记录，每个冷却期对应冷却期目录中的一个文件，文件修改时间即冷却期开始时间"""
+    
+    def __init__(self, cooldown_dir: str):
+        self.cooldown_dir = cooldown_dir
+        Path(self.cooldown_dir).mkdir(parents=True, exist_ok=True)
+        
+        # 冷却期开始时间: 冷却期文件名 -> 单调时钟时间，首次检查时扫描一次冷却期目录
+        self._cooldowns: Optional[Dict[str, float]] = None
+        self._lock = threading.Lock()
+    
+    def load(self) -> Dict[str, float]:
+        """获取所有冷却期的开始时间，进程内只扫描一次冷却期目录"""
+        with self._lock:
+            if self._cooldowns is None:
+                cooldowns = {}
+                # 冷却期文件的修改时间是墙上时间，读取时换算为单调时钟，之后的比较不受系统时间调整影响
+                wall_now = time.time()
+                monotonic_now = time.monotonic()
+                try:
+                    with os.scandir(self.cooldown_dir) as entries:
+                        for entry in entries:
+                            if entry.is_file():
+                                cooldowns[entry.name] = monotonic_now - max(0.0, wall_now - entry.stat().st_mtime)
+                except OSError as e:
+                    logger.error(f"Error loading cooldowns: {e}")
+                self._cooldowns = cooldowns
+            return self._cooldowns
+    
+    def is_active(self, rule_name: str, node_name: str, cooldown_seconds: float) -> bool:
+        """检查冷却期"""
+        started_at = self.load().get(f"{rule_name}_{node_name}")
+        if started_at is None:
+            return False
+        
+        return (time.monotonic() - started_at) < cooldown_seconds
+    
+    def start(self, rule_name: str, node_name: str) -> None:
+        """设置冷却期"""
+        try:
+            cooldown_file = f"{self.cooldown_dir}/{rule_name}_{node_name}"
+            Path(cooldown_file).touch()
+            self.load()[f"{rule_name}_{node_name}"] = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error setting cooldown: {e}")
+    
+    def clear_rule(self, rule_name: str) -> None:
+        """清理规则的所有冷却期，一次扫描冷却期目录按前缀匹配"""
+        prefix = f"{rule_name}_"
+        try:
+            with os.scandir(self.cooldown_dir) as entries:
+                for entry in entries:
+                    if entry.name.startswith(prefix):
+                        try:
+                            os.unlink(entry.path)
+                        except FileNotFoundError:
+                            # 另一个管理器可能同时清理了同一个冷却期文件
+                            pass
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error clearing cooldowns for rule {rule_name}: {e}")
+        with self._lock:
+            if self._cooldowns is not None:
+                for name in [name for name in self._cooldowns if name.startswith(prefix)]:
+                    del self._cooldowns[name]
@@ -9,8 +9,7 @@ import json
 import smtplib
 import argparse
 import os
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from email.message import EmailMessage
 from typing import Dict, Any, Optional
 import logging
 
@@ -119,7 +118,7 @@ class EmailSender:
         
         return True
     
-    def create_message(self, subject: str, body: str, is_html: bool = False) -> MIMEMultipart:
+    def create_message(self, subject: str, body: str, is_html: bool = False) -> EmailMessage:
         """
         创建邮件消息
         
@@ -129,18 +128,15 @@ class EmailSender:
             is_html: 是否为HTML格式
             
         Returns:
-            MIMEMultipart: 邮件消息对象
+            EmailMessage: 邮件消息对象
         """
-        msg = MIMEMultipart('alternative')
+        msg = EmailMessage()
         msg['From'] = self.from_email
         msg['To'] = ', '.join(self.to_emails)
         msg['Subject'] = subject
         
-        # 添加邮件正文
-        if is_html:
-            msg.attach(MIMEText(body, 'html', 'utf-8'))
-        else:
-            msg.attach(MIMEText(body, 'plain', 'utf-8'))
+        # 添加邮件正文，单一正文无需multipart容器
+        msg.set_content(body, subtype='html' if is_html else 'plain')
         
         return msg
     